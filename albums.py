@@ -0,0 +1,56 @@
+import logging
+import threading
+from typing import Callable, Dict, List, Set
+
+from config import ALBUM_WINDOW
+
+logger = logging.getLogger(__name__)
+
+class MediaGroupAggregator:
+    """Collect album updates that share a media_group_id and release each album once
+
+    Telegram delivers an album as one update per item. Every new item
+    restarts the album's timer; once no item has arrived for `window`
+    seconds the whole album is passed to on_album in message order.
+    holds() tells whether an update is still waiting in a buffer.
+    """
+
+    def __init__(self, on_album: Callable[[List[dict]], None], window: float = ALBUM_WINDOW):
+        self.on_album = on_album
+        self.window = window
+        self.lock = threading.Lock()
+        self.albums: Dict[str, List[dict]] = {}
+        self.timers: Dict[str, threading.Timer] = {}
+        self.held: Set[int] = set()  # update_ids of buffered items
+
+    def add(self, update: dict):
+        """Buffer one album item"""
+        key = update["message"]["media_group_id"]
+        with self.lock:
+            self.albums.setdefault(key, []).append(update)
+            self.held.add(update["update_id"])
+            timer = self.timers.pop(key, None)
+            if timer is not None:
+                timer.cancel()
+            timer = self.timers[key] = threading.Timer(self.window, self.release, args=(key,))
+            timer.daemon = True
+            timer.start()
+
+    def holds(self, update_id: int) -> bool:
+        with self.lock:
+            return update_id in self.held
+
+    def release(self, key: str):
+        with self.lock:
+            self.timers.pop(key, None)
+            updates = self.albums.pop(key, None)
+            if not updates:
+                return
+            self.held.difference_update(u["update_id"] for u in updates)
+
+        updates.sort(key=lambda u: u["message"]["message_id"])
+        logger.info(f"Album {key} complete with {len(updates)} items")
+        try:
+            self.on_album(updates)
+        except Exception as e:
+            logger.error(f"Error handling album {key}: {e}")
@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+import asyncio
+import logging
+import time
+from typing import Optional
+
+import httpx
+
+from config import BROADCAST_CONCURRENCY, FLOOD_MAX_RETRIES, HTTP_POOL_SIZE
+from broadcast import PreparedBroadcast, fan_out_async
+from metrics import api_metrics, bot_status
+from rate_limit import rate_limiter, UNTHROTTLED_METHODS
+from keep_alive import keep_alive
+from poller import UpdatePoller
+from update_log import UpdateLog
+from jobs import JobStore, BroadcastJob, BroadcastRun
+from utils import GroupManager
+from bot_api import BASE_URL, JSON_HEADERS, parse_response, request_failed, settle_response
+from simple_news_bot import (
+    ADMIN_IDS, ADMIN_ONLY_TEXT, NO_GROUPS_TEXT,
+    start_reply, help_text, status_text, group_event_text, broadcast_status_text,
+    broadcast_progress_text, startup_text
+)
+
+logger = logging.getLogger(__name__)
+
+class AsyncTelegramBot:
+    """asyncio variant of TelegramBot: polling, commands and broadcasts share one event loop"""
+
+    def __init__(self):
+        self.group_manager = GroupManager()
+        self.base_url = BASE_URL
+        self.update_log = UpdateLog()
+        self.jobs = JobStore()
+        self.last_update_id = self.update_log.offset - 1
+        self.bot_username = None
+        self.client: Optional[httpx.AsyncClient] = None
+        self.tasks = set()
+        bot_status.register_gauge("drct_update_queue_depth", "Updates being processed", lambda: len(self.tasks))
+        bot_status.register_gauge("drct_active_groups", "Groups receiving broadcasts", self.group_manager.get_group_count)
+
+    async def make_request(self, method: str, params: dict = None, timeout: float = 10,
+                           retries: int = FLOOD_MAX_RETRIES, body: bytes = None, cost: int = 1) -> dict:
+        """Make a request to Telegram API (see BotApiClient.make_request; only the transport differs)"""
+        url = f"{self.base_url}/{method}"
+        params = params or {}
+        if body is None:
+            payload = {"json": params}
+        else:
+            payload = {"content": body, "headers": JSON_HEADERS}
+
+        for attempt in range(retries + 1):
+            if method not in UNTHROTTLED_METHODS:
+                api_metrics.record_wait(method, await rate_limiter.wait_async(params.get("chat_id"), cost))
+            started = time.monotonic()
+            try:
+                result = parse_response(await self.client.post(url, timeout=timeout, **payload))
+            except httpx.TimeoutException as e:
+                return request_failed(method, started, e, timed_out=True)
+            except (httpx.HTTPError, ValueError) as e:
+                return request_failed(method, started, e)
+
+            if settle_response(method, result, started, rate_limiter, attempt, retries):
+                return result
+
+    async def send_message(self, chat_id: int, text: str, parse_mode: str = None) -> dict:
+        """Send a message to a chat"""
+        params = {
+            "chat_id": chat_id,
+            "text": text[:4096]  # Telegram message limit
+        }
+        if parse_mode:
+            params["parse_mode"] = parse_mode
+        return await self.make_request("sendMessage", params)
+
+    async def send_prepared(self, chat_id: int, prepared: PreparedBroadcast) -> dict:
+        """Send a prepared broadcast to one chat"""
+        return await self.make_request(
+            prepared.method, {"chat_id": chat_id},
+            body=prepared.body_for(chat_id), cost=prepared.cost
+        )
+
+    async def send_message_as_bot(self, chat_id: int, message: dict) -> dict:
+        """Send a message as the bot without revealing admin identity"""
+        try:
+            return await self.send_prepared(chat_id, PreparedBroadcast.from_message(message))
+        except Exception as e:
+            logger.error(f"Error sending message as bot: {e}")
+            return {"ok": False, "error": str(e)}
+
+    async def handle_start_command(self, update: dict):
+        """Handle /start command"""
+        chat = update["message"]["chat"]
+        user = update["message"]["from"]
+        text, parse_mode = start_reply(chat, user)
+        await self.send_message(chat["id"], text, parse_mode=parse_mode)
+
+    async def handle_help_command(self, update: dict):
+        """Handle /help command"""
+        user = update["message"]["from"]
+        chat_id = update["message"]["chat"]["id"]
+        await self.send_message(chat_id, help_text(user["id"]), parse_mode="Markdown")
+
+    async def handle_status_command(self, update: dict):
+        """Handle /status command"""
+        user = update["message"]["from"]
+        chat_id = update["message"]["chat"]["id"]
+
+        if user["id"] not in ADMIN_IDS:
+            await self.send_message(chat_id, ADMIN_ONLY_TEXT)
+            return
+
+        group_count = self.group_manager.get_group_count()
+        await self.send_message(chat_id, status_text(group_count), parse_mode="Markdown")
+
+    async def handle_groups_command(self, update: dict):
+        """Handle /groups command"""
+        user = update["message"]["from"]
+        chat_id = update["message"]["chat"]["id"]
+
+        if user["id"] not in ADMIN_IDS:
+            await self.send_message(chat_id, ADMIN_ONLY_TEXT)
+            return
+
+        groups_info = self.group_manager.get_groups_info()
+        await self.send_message(chat_id, groups_info, parse_mode="Markdown")
+
+    async def notify_admins(self, text: str):
+        """Send a Markdown notification to every admin concurrently"""
+        await asyncio.gather(*(
+            self.send_message(admin_id, text, parse_mode="Markdown")
+            for admin_id in ADMIN_IDS
+        ))
+
+    async def handle_group_updates(self, update: dict):
+        """Handle bot being added to or removed from groups"""
+        message = update.get("message", {})
+        chat = message.get("chat", {})
+
+        # Check if bot was added to group
+        if "new_chat_members" in message:
+            for member in message["new_chat_members"]:
+                if member.get("username") == self.bot_username:
+                    self.group_manager.add_group(
+                        chat["id"],
+                        chat.get("title", "Unknown Group"),
+                        chat["type"]
+                    )
+                    logger.info(f"Bot added to group: {chat.get('title')} ({chat['id']})")
+                    await self.notify_admins(group_event_text(
+                        "🎉 *Naya Group Connected!*", chat, self.group_manager.get_group_count()
+                    ))
+
+        # Check if bot was removed from group
+        if "left_chat_member" in message:
+            left_member = message["left_chat_member"]
+            if left_member.get("username") == self.bot_username:
+                self.group_manager.remove_group(chat["id"])
+                logger.info(f"Bot removed from group: {chat.get('title')} ({chat['id']})")
+                await self.notify_admins(group_event_text(
+                    "❌ *Group Disconnected*", chat, self.group_manager.get_group_count()
+                ))
+
+    async def broadcast_message(self, update: dict):
+        """Handle messages from admin and broadcast to all groups"""
+        message = update["message"]
+        user = message["from"]
+        chat_id = message["chat"]["id"]
+
+        # Only allow admins to broadcast
+        if user["id"] not in ADMIN_IDS:
+            return
+
+        # Don't broadcast commands
+        if message.get("text", "").startswith('/'):
+            return
+
+        active_groups = self.group_manager.get_active_groups()
+
+        if not active_groups:
+            await self.send_message(chat_id, NO_GROUPS_TEXT)
+            return
+
+        # Build and serialise the outgoing request once, and persist the job
+        # before any API call so a restart can pick up where it left off
+        prepared = PreparedBroadcast.from_message(message)
+        job = self.jobs.create_job(chat_id, prepared, active_groups)
+
+        # Send "sending" notification to admin
+        sending_response = await self.send_message(
+            chat_id,
+            f"📤 Message broadcast kar raha hun {len(active_groups)} groups mein...",
+            parse_mode="Markdown"
+        )
+        if sending_response.get("ok"):
+            self.jobs.set_status_message(job, sending_response["result"]["message_id"])
+
+        await self.run_broadcast_job(job)
+
+    async def edit_status_message(self, job: BroadcastJob, text: str):
+        """Replace the text of a job's status message, if it has one"""
+        if job.status_message_id:
+            await self.make_request("editMessageText", {
+                "chat_id": job.admin_chat_id,
+                "message_id": job.status_message_id,
+                "text": text,
+                "parse_mode": "Markdown"
+            })
+
+    async def run_broadcast_job(self, job: BroadcastJob):
+        """Send a job to its pending targets, recording each delivery as it happens"""
+        with BroadcastRun(self.jobs, job, self.group_manager) as run:
+            # A fixed set of worker tasks sends to the pending groups; the shared rate limiter paces them
+            send = lambda group_id: self.send_prepared(group_id, job.prepared)
+            async for group_id, result in fan_out_async(run.targets, send, BROADCAST_CONCURRENCY):
+                if isinstance(result, Exception):
+                    logger.error(f"Unexpected error for group {group_id}: {result}")
+                    result = {"ok": False, "error": str(result)}
+                if run.record_result(group_id, result):
+                    await self.edit_status_message(job, broadcast_progress_text(run.progress))
+
+            success_count, failed_count = await asyncio.to_thread(run.finish)
+        await self.edit_status_message(job, broadcast_status_text(success_count, failed_count))
+
+    async def handle_update(self, update: dict):
+        """Process an update unless its message was already handled, then clear it from the inbox"""
+        message = update.get("message")
+        try:
+            if message and not self.update_log.claim(message["chat"]["id"], message["message_id"]):
+                logger.info(f"Skipping already handled message {message['message_id']} in {message['chat']['id']}")
+                return
+            await self.process_update(update)
+        finally:
+            self.update_log.done(update["update_id"])
+
+    async def process_update(self, update: dict):
+        """Process a single update"""
+        try:
+            if "message" not in update:
+                return
+
+            message = update["message"]
+            text = message.get("text", "")
+
+            # Handle commands
+            if text.startswith("/start"):
+                await self.handle_start_command(update)
+            elif text.startswith("/help"):
+                await self.handle_help_command(update)
+            elif text.startswith("/status"):
+                await self.handle_status_command(update)
+            elif text.startswith("/groups"):
+                await self.handle_groups_command(update)
+
+            # Handle group membership changes
+            if "new_chat_members" in message or "left_chat_member" in message:
+                await self.handle_group_updates(update)
+
+            # Handle admin messages for broadcasting
+            if message["chat"]["type"] == "private":
+                await self.broadcast_message(update)
+
+        except Exception as e:
+            logger.error(f"Error processing update: {e}")
+
+    def spawn(self, coro):
+        """Run a coroutine in the background, keeping a reference until it finishes"""
+        task = asyncio.create_task(coro)
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+        return task
+
+    async def start_polling(self):
+        """Start the bot and begin polling for updates"""
+        limits = httpx.Limits(max_connections=HTTP_POOL_SIZE, max_keepalive_connections=HTTP_POOL_SIZE)
+        async with httpx.AsyncClient(limits=limits) as client:
+            self.client = client
+
+            me_response = await self.make_request("getMe")
+            if not me_response.get("ok"):
+                bot_status.failed("Bot could not start")
+                raise RuntimeError(f"Failed to get bot info: {me_response}")
+
+            bot_info = me_response["result"]
+            self.bot_username = bot_info["username"]
+            logger.info(f"Bot started: @{bot_info['username']} ({bot_info['first_name']})")
+            logger.info(f"Admin IDs: {ADMIN_IDS}")
+            await self.notify_admins(startup_text(bot_info, self.group_manager.get_group_count()))
+
+            # getUpdates is refused while a webhook is registered
+            await self.make_request("deleteWebhook")
+
+            # Broadcasts interrupted by a crash or redeploy; a claimed message
+            # always has its job on disk, so replayed duplicates can be skipped
+            self.jobs.prune()
+            for job in self.jobs.unfinished_jobs():
+                logger.info(f"Resuming broadcast job {job.id}")
+                self.spawn(self.run_broadcast_job(job))
+
+            # Updates received but not handled before the last shutdown
+            for update in self.update_log.unfinished():
+                self.spawn(self.handle_update(update))
+
+            logger.info("Starting to poll for updates...")
+            poller = UpdatePoller(offset=self.last_update_id + 1)
+
+            while True:
+                try:
+                    updates_response = await self.make_request(
+                        "getUpdates", poller.request_params(), timeout=poller.http_timeout
+                    )
+                    updates = poller.handle_response(updates_response)
+                    if poller.delay:
+                        await asyncio.sleep(poller.delay)
+
+                    # Each update runs as its own task so a long broadcast
+                    # never holds up polling or other admins' commands; they
+                    # are on disk with the new offset before the next poll acknowledges them
+                    self.update_log.record_fetched(updates, poller.offset)
+                    for update in updates:
+                        self.last_update_id = update["update_id"]
+                        self.spawn(self.handle_update(update))
+
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.error(f"Error in polling loop: {e}")
+                    await asyncio.sleep(poller.backoff.next_delay())
+
+def main():
+    """Main function to start the bot"""
+    try:
+        keep_alive()
+        asyncio.run(AsyncTelegramBot().start_polling())
+    except KeyboardInterrupt:
+        logger.info("Bot stopped by user")
+    except Exception as e:
+        logger.error(f"Bot crashed: {e}")
+        raise
+
+if __name__ == "__main__":
+    main()
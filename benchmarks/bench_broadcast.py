@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""End-to-end broadcast benchmark against the local mock Bot API
+
+Runs one admin broadcast through TelegramBot.broadcast_message (raw Bot
+API bot) and/or BotHandlers.broadcast_message (python-telegram-bot) for
+each audience size, and reports wall time, sends/sec, p99 send latency
+and peak RSS. Each run happens in a fresh process with its own database,
+so runs don't share caches, connections or memory high-water marks.
+
+    python benchmarks/bench_broadcast.py --impl simple ptb --groups 1000 10000 100000
+
+Telegram's global limit is lifted by default so the numbers show the
+bot's own overhead; pass --global-rate 30 to benchmark under real limits.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from mock_bot_api import start_mock_server
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ADMIN_ID = 424242
+FIRST_GROUP_ID = -1001000000000
+
+IMPLS = ("simple", "ptb")
+# Methods that deliver a broadcast to a group (text, forwards, copies, albums)
+SEND_METHODS = ("sendMessage", "forwardMessage", "copyMessage", "copyMessages", "sendMediaGroup")
+
+def admin_update() -> dict:
+    """A text message from the admin, as Telegram would deliver it"""
+    admin = {"id": ADMIN_ID, "is_bot": False, "first_name": "Bench"}
+    return {
+        "update_id": 1,
+        "message": {
+            "message_id": 1,
+            "date": int(time.time()),
+            "chat": {"id": ADMIN_ID, "type": "private", "first_name": "Bench"},
+            "from": admin,
+            "text": "Benchmark broadcast: DRCT NEWS load test"
+        }
+    }
+
+def seed_groups(count: int):
+    """Store count active groups in the configured database"""
+    from storage import SqliteGroupStore
+
+    store = SqliteGroupStore(migrate_from=None)
+    with store.lock:
+        store.conn.execute("BEGIN")
+        store.conn.executemany(
+            "INSERT OR IGNORE INTO groups (id, title, type, active, added_date) VALUES (?, ?, 'supergroup', 1, NULL)",
+            ((FIRST_GROUP_ID - i, f"Bench group {i}") for i in range(count))
+        )
+        store.conn.execute("COMMIT")
+    store.close()
+
+def run_simple() -> float:
+    from simple_news_bot import TelegramBot
+
+    bot = TelegramBot()
+    started = time.perf_counter()
+    bot.broadcast_message(admin_update())
+    bot.lanes.wait_idle()
+    return time.perf_counter() - started
+
+def run_ptb() -> float:
+    from types import SimpleNamespace
+    from telegram import Update
+    from bot import NewsBot
+
+    async def broadcast():
+        news_bot = NewsBot()
+        app = news_bot.build_application()
+        await app.initialize()
+        try:
+            update = Update.de_json(admin_update(), app.bot)
+            started = time.perf_counter()
+            await news_bot.handlers.broadcast_message(update, SimpleNamespace(bot=app.bot))
+            return time.perf_counter() - started
+        finally:
+            await app.shutdown()
+
+    return asyncio.run(broadcast())
+
+def run_child(impl: str, groups: int):
+    """Benchmark one implementation in this process and print the result as JSON"""
+    sys.path.insert(0, ROOT)
+    seed_groups(groups)
+    wall = run_simple() if impl == "simple" else run_ptb()
+
+    from metrics import api_metrics
+    snapshot = api_metrics.snapshot()
+    sends = [snapshot[method] for method in SEND_METHODS if method in snapshot]
+    print(json.dumps({
+        "impl": impl,
+        "groups": groups,
+        "wall": wall,
+        "calls": sum(figures["calls"] for figures in sends),
+        "errors": sum(figures["errors"] for figures in sends),
+        "flood_limited": sum(figures["flood_limited"] for figures in sends),
+        "sends_per_sec": groups / wall if wall else 0.0,
+        # Worst method's p99; one method does nearly all the sends in practice
+        "p99": max((figures["p99"] for figures in sends), default=0.0),
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    }))
+
+def child_env(args, api_url: str, workdir: str) -> dict:
+    env = dict(os.environ)
+    env.update({
+        "BOT_TOKEN": "123456:BENCHMARK",
+        "ADMIN_ID": str(ADMIN_ID),
+        "TELEGRAM_API_URL": api_url,
+        "GROUPS_BACKEND": "sqlite",
+        "DB_FILE": os.path.join(workdir, "bench.db"),
+        # Lifting the global limit measures the bot rather than Telegram's 30 msgs/sec
+        "RATE_LIMIT_GLOBAL": str(args.global_rate or 1e9),
+        "BROADCAST_PROGRESS_INTERVAL": str(args.progress_interval),
+        "PYTHONPATH": os.pathsep.join(filter(None, [ROOT, env.get("PYTHONPATH")]))
+    })
+    if args.concurrency:
+        env["BROADCAST_CONCURRENCY"] = str(args.concurrency)
+    if args.processes:
+        env["BROADCAST_PROCESSES"] = str(args.processes)
+        env["BROADCAST_SHARD_MIN"] = "0"
+    return env
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark broadcasts against a local mock Bot API")
+    parser.add_argument("--impl", nargs="+", choices=IMPLS, default=list(IMPLS))
+    parser.add_argument("--groups", nargs="+", type=int, default=[1000, 10000, 100000])
+    parser.add_argument("--concurrency", type=int, help="BROADCAST_CONCURRENCY for the bot (default: config)")
+    parser.add_argument("--processes", type=int, help="BROADCAST_PROCESSES for the raw API bot (default: config)")
+    parser.add_argument("--global-rate", type=float, default=0, help="RATE_LIMIT_GLOBAL (0 = unlimited)")
+    parser.add_argument("--progress-interval", type=float, default=5)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--jitter", type=float, default=0.02)
+    parser.add_argument("--flood-rate", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=int, default=1)
+    parser.add_argument("--forbidden-rate", type=float, default=0.0)
+    parser.add_argument("--not-found-rate", type=float, default=0.0)
+    parser.add_argument("--json", help="also write the results to this file")
+    parser.add_argument("--child", nargs=2, metavar=("IMPL", "GROUPS"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        # Keep per-group failure logs out of the measurement
+        logging.disable(logging.ERROR)
+        run_child(args.child[0], int(args.child[1]))
+        return
+
+    server = start_mock_server(
+        latency=args.latency, jitter=args.jitter, flood_rate=args.flood_rate, retry_after=args.retry_after,
+        forbidden_rate=args.forbidden_rate, not_found_rate=args.not_found_rate
+    )
+    api_url = f"http://127.0.0.1:{server.server_port}"
+
+    results = []
+    print(f"{'impl':<8}{'groups':>8}{'wall s':>10}{'sends/s':>10}{'p99 ms':>9}{'429s':>7}{'errors':>8}{'RSS MB':>9}")
+    for impl in args.impl:
+        for groups in args.groups:
+            with tempfile.TemporaryDirectory() as workdir:
+                proc = subprocess.run(
+                    [sys.executable, os.path.abspath(__file__), "--child", impl, str(groups)],
+                    env=child_env(args, api_url, workdir), cwd=workdir, capture_output=True, text=True
+                )
+            if proc.returncode != 0:
+                print(f"{impl:<8}{groups:>8}  failed:\n{proc.stderr.strip()}")
+                continue
+            result = json.loads(proc.stdout.strip().splitlines()[-1])
+            results.append(result)
+            print(
+                f"{impl:<8}{groups:>8}{result['wall']:>10.2f}{result['sends_per_sec']:>10.0f}"
+                f"{result['p99'] * 1000:>9.0f}{result['flood_limited']:>7}{result['errors']:>8}"
+                f"{result['peak_rss_mb']:>9.1f}"
+            )
+
+    server.shutdown()
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
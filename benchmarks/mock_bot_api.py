@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""Local stand-in for the Telegram Bot API, for offline benchmarks
+
+Point the bot at it with TELEGRAM_API_URL=http://127.0.0.1:8081. Every
+method answers like Telegram would, after a configurable latency. Flood
+control (429), "bot was blocked" (403) and "chat not found" (400) can be
+injected; blocked and missing chats are picked deterministically from the
+chat id, so the same groups fail on every run.
+
+    python benchmarks/mock_bot_api.py --port 8081 --latency 0.05 --flood-rate 0.01
+"""
+import argparse
+import json
+import logging
+import random
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl
+
+logger = logging.getLogger(__name__)
+
+BOT_INFO = {
+    "id": 1000000001,
+    "is_bot": True,
+    "first_name": "DRCT News (mock)",
+    "username": "drctnewsbot",
+    "can_join_groups": True,
+    "can_read_all_group_messages": False,
+    "supports_inline_queries": False
+}
+
+# Methods that answer with the Message they created
+MESSAGE_METHODS = {
+    "sendMessage", "forwardMessage", "sendPhoto", "sendVideo", "sendDocument",
+    "sendAudio", "sendVoice", "sendAnimation", "editMessageText"
+}
+
+class MockSettings:
+    """Behaviour of the mock server, shared by every request thread"""
+
+    def __init__(self, latency: float = 0.05, jitter: float = 0.02, flood_rate: float = 0.0,
+                 retry_after: int = 1, forbidden_rate: float = 0.0, not_found_rate: float = 0.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.flood_rate = flood_rate
+        self.retry_after = retry_after
+        self.forbidden_rate = forbidden_rate
+        self.not_found_rate = not_found_rate
+        self.lock = threading.Lock()
+        self.calls = Counter()
+        self.message_id = 0
+
+    def next_message_id(self) -> int:
+        with self.lock:
+            self.message_id += 1
+            return self.message_id
+
+    def count(self, key: str):
+        with self.lock:
+            self.calls[key] += 1
+
+def chat_fraction(chat_id: int) -> float:
+    """Stable pseudo-random value in [0, 1) for a chat"""
+    return (chat_id * 2654435761 % 2 ** 32) / 2 ** 32
+
+class MockBotApiHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 so clients can keep connections alive, like with api.telegram.org
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; with Nagle on, the body waits
+    # for the client's delayed ACK and every pooled request stalls ~40ms
+    disable_nagle_algorithm = True
+    settings: MockSettings = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def reply(self, status: int, payload: dict):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def read_params(self) -> dict:
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b""
+        if not raw:
+            return {}
+        if self.headers.get("Content-Type", "").startswith("application/json"):
+            return json.loads(raw)
+        # python-telegram-bot sends url-encoded forms; only simple fields matter here
+        return dict(parse_qsl(raw.decode("utf-8", "replace")))
+
+    def do_GET(self):
+        if self.path == "/stats":
+            with self.settings.lock:
+                self.reply(200, dict(self.settings.calls))
+            return
+        self.reply(404, {"ok": False, "error_code": 404, "description": "Not Found"})
+
+    def do_POST(self):
+        settings = self.settings
+        method = self.path.rstrip("/").rsplit("/", 1)[-1]
+        params = self.read_params()
+        settings.count(method)
+
+        if method == "getUpdates":
+            # Nobody is talking to the mock bot; hold the long poll briefly
+            time.sleep(min(float(params.get("timeout", 0) or 0), 1.0))
+            self.reply(200, {"ok": True, "result": []})
+            return
+
+        if settings.latency or settings.jitter:
+            time.sleep(max(0.0, random.gauss(settings.latency, settings.jitter)))
+
+        if method == "getMe":
+            self.reply(200, {"ok": True, "result": BOT_INFO})
+            return
+
+        chat_id = int(params.get("chat_id", 0) or 0)
+        if chat_id and settings.flood_rate and random.random() < settings.flood_rate:
+            settings.count("429")
+            self.reply(429, {
+                "ok": False,
+                "error_code": 429,
+                "description": f"Too Many Requests: retry after {settings.retry_after}",
+                "parameters": {"retry_after": settings.retry_after}
+            })
+            return
+
+        if chat_id < 0:
+            fraction = chat_fraction(chat_id)
+            if fraction < settings.forbidden_rate:
+                settings.count("403")
+                self.reply(403, {
+                    "ok": False, "error_code": 403, "description": "Forbidden: bot was blocked by the user"
+                })
+                return
+            if fraction < settings.forbidden_rate + settings.not_found_rate:
+                settings.count("400")
+                self.reply(400, {"ok": False, "error_code": 400, "description": "Bad Request: chat not found"})
+                return
+
+        self.reply(200, {"ok": True, "result": self.result_for(method, chat_id, params)})
+
+    def result_for(self, method: str, chat_id: int, params: dict):
+        chat = {"id": chat_id, "type": "supergroup" if chat_id < 0 else "private"}
+        if chat_id < 0:
+            chat["title"] = f"Group {chat_id}"
+        if method in MESSAGE_METHODS:
+            return {
+                "message_id": self.settings.next_message_id(),
+                "date": int(time.time()),
+                "chat": chat,
+                "from": BOT_INFO,
+                "text": params.get("text", "")
+            }
+        if method == "copyMessage":
+            return {"message_id": self.settings.next_message_id()}
+        if method == "copyMessages":
+            message_ids = params.get("message_ids") or []
+            if isinstance(message_ids, str):
+                message_ids = json.loads(message_ids)
+            return [{"message_id": self.settings.next_message_id()} for _ in message_ids]
+        if method == "sendMediaGroup":
+            media = params.get("media") or []
+            if isinstance(media, str):
+                media = json.loads(media)
+            return [
+                {"message_id": self.settings.next_message_id(), "date": int(time.time()), "chat": chat}
+                for _ in media
+            ]
+        return True
+
+def start_mock_server(host: str = "127.0.0.1", port: int = 0, **settings) -> ThreadingHTTPServer:
+    """Serve the mock API on a background thread; port 0 picks a free one (see server.server_port)"""
+    handler = type("Handler", (MockBotApiHandler,), {"settings": MockSettings(**settings)})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="mock-bot-api", daemon=True).start()
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description="Local mock of the Telegram Bot API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency", type=float, default=0.05, help="mean response time in seconds")
+    parser.add_argument("--jitter", type=float, default=0.02, help="standard deviation of the response time")
+    parser.add_argument("--flood-rate", type=float, default=0.0, help="fraction of sends answered with 429")
+    parser.add_argument("--retry-after", type=int, default=1, help="retry_after given with each 429")
+    parser.add_argument("--forbidden-rate", type=float, default=0.0, help="fraction of groups that blocked the bot")
+    parser.add_argument("--not-found-rate", type=float, default=0.0, help="fraction of groups that no longer exist")
+    args = parser.parse_args()
+
+    logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', level=logging.INFO)
+    server = start_mock_server(
+        args.host, args.port, latency=args.latency, jitter=args.jitter, flood_rate=args.flood_rate,
+        retry_after=args.retry_after, forbidden_rate=args.forbidden_rate, not_found_rate=args.not_found_rate
+    )
+    logger.info(f"Mock Bot API listening on http://{args.host}:{server.server_port}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
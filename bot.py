@@ -1,9 +1,16 @@
 import logging
 import asyncio
+import secrets
 from telegram import Update
 from telegram.ext import Application, CommandHandler, MessageHandler, filters
-from config import BOT_TOKEN, ADMIN_ID
+from config import (
+    BOT_TOKEN, ADMIN_ID, TELEGRAM_API_URL, WEBHOOK_URL, WEBHOOK_PATH, WEBHOOK_SECRET, POLL_TIMEOUT,
+    HTTP_POOL_SIZE
+)
 from handlers import BotHandlers
+from keep_alive import keep_alive, set_update_handler
+from ptb_request import SharedRateLimiter, InstrumentedRequest
+from metrics import bot_status
 
 # Set up logging
 logging.basicConfig(
@@ -43,34 +50,92 @@ class NewsBot:
     
     async def post_init(self, application):
         """Post initialization setup"""
-        bot_info = await application.bot.get_me()
+        # initialize() already called getMe; cache that identity for every handler
+        bot_info = application.bot.bot
+        application.bot_data["bot_user"] = bot_info
+        bot_status.register_gauge("drct_update_queue_depth", "Updates waiting to be processed", application.update_queue.qsize)
+        bot_status.register_gauge(
+            "drct_active_groups", "Groups receiving broadcasts", self.handlers.group_manager.get_group_count
+        )
         logger.info(f"Bot started: @{bot_info.username} ({bot_info.first_name})")
         logger.info(f"Admin ID: {ADMIN_ID}")
         
+        # Finish any broadcast interrupted by a restart, without blocking startup
+        application.create_task(self.handlers.resume_broadcasts(application.bot))
+        
         # Update bot username in config if needed
         import config
         config.BOT_USERNAME = bot_info.username
     
+    async def run_webhook(self):
+        """Serve updates pushed to the keep-alive server's webhook route"""
+        app = self.application
+        secret = WEBHOOK_SECRET or secrets.token_urlsafe(32)
+        loop = asyncio.get_running_loop()
+        
+        def enqueue(data: dict):
+            # Called from a Flask worker thread; hand off to the bot's event loop
+            update = Update.de_json(data, app.bot)
+            asyncio.run_coroutine_threadsafe(app.update_queue.put(update), loop)
+        
+        await app.initialize()
+        await self.post_init(app)
+        set_update_handler(enqueue, secret)
+        await app.bot.set_webhook(
+            url=f"{WEBHOOK_URL.rstrip('/')}{WEBHOOK_PATH}",
+            secret_token=secret,
+            allowed_updates=[Update.MESSAGE]
+        )
+        await app.start()
+        bot_status.serving_webhook()
+        keep_alive()
+        logger.info(f"Receiving updates via webhook at {WEBHOOK_URL}{WEBHOOK_PATH}")
+        
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await app.stop()
+            await app.shutdown()
+    
+    def build_application(self) -> Application:
+        """Create the application with the shared rate limiter, metrics and handlers"""
+        self.application = (
+            Application.builder()
+            .token(BOT_TOKEN)
+            .base_url(f"{TELEGRAM_API_URL}/bot")
+            .base_file_url(f"{TELEGRAM_API_URL}/file/bot")
+            .rate_limiter(SharedRateLimiter())
+            .request(InstrumentedRequest(connection_pool_size=HTTP_POOL_SIZE))
+            .get_updates_request(InstrumentedRequest())
+            .post_init(self.post_init)
+            .build()
+        )
+        self.setup_handlers()
+        return self.application
+    
     def run(self):
         """Start the bot"""
         try:
-            # Create application
-            self.application = Application.builder().token(BOT_TOKEN).post_init(self.post_init).build()
-            
-            # Set up handlers
-            self.setup_handlers()
+            self.build_application()
             
             logger.info("Starting news broadcasting bot...")
             logger.info(f"Admin ID: {ADMIN_ID}")
             
             # Run the bot
-            self.application.run_polling(
-                drop_pending_updates=True,
-                allowed_updates=Update.ALL_TYPES
-            )
+            if WEBHOOK_URL:
+                asyncio.run(self.run_webhook())
+            else:
+                # /metrics and /healthz are served in polling mode too
+                keep_alive()
+                self.application.run_polling(
+                    timeout=POLL_TIMEOUT,
+                    drop_pending_updates=False,
+                    allowed_updates=[Update.MESSAGE]
+                )
             
         except Exception as e:
             logger.error(f"Error starting bot: {e}")
+            bot_status.failed("Bot could not start")
             raise
 
 def main():
@@ -0,0 +1,107 @@
+import logging
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import BOT_TOKEN, TELEGRAM_API_URL, FLOOD_MAX_RETRIES, HTTP_POOL_SIZE
+from broadcast import PreparedBroadcast
+from metrics import api_metrics
+from rate_limit import RateLimiter, rate_limiter, is_flood_limited, UNTHROTTLED_METHODS
+
+logger = logging.getLogger(__name__)
+
+BASE_URL = f"{TELEGRAM_API_URL}/bot{BOT_TOKEN}"
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+# Transport-independent steps of make_request, shared with AsyncTelegramBot
+
+def parse_response(response) -> dict:
+    """Decode an API response (requests or httpx)"""
+    # API errors (429, 403, 400...) come back as JSON with a description
+    try:
+        return response.json()
+    except ValueError:
+        response.raise_for_status()
+        raise
+
+def request_failed(method: str, started: float, error: Exception, timed_out: bool = False) -> dict:
+    """Record a request that got no API response and return the result to report for it"""
+    api_metrics.record(method, time.monotonic() - started, ok=False)
+    if timed_out:
+        logger.warning(f"Timeout for {method}, retrying...")
+        return {"ok": False, "error": "timeout"}
+    logger.error(f"API request failed: {error}")
+    return {"ok": False, "error": str(error)}
+
+def settle_response(method: str, result: dict, started: float, limiter: RateLimiter,
+                    attempt: int, retries: int) -> bool:
+    """Record an API response and apply flood control; True if it is final, False to retry the call"""
+    flood_limited = is_flood_limited(result)
+    api_metrics.record(method, time.monotonic() - started, bool(result.get("ok")), flood_limited)
+    if not flood_limited:
+        return True
+
+    # Flood control: hold back every send, this one's retry or requeue included
+    retry_after = result.get("parameters", {}).get("retry_after", 1)
+    limiter.pause(retry_after)
+    if attempt == retries:
+        return True
+    logger.warning(
+        f"Flood limit hit on {method}, pausing sends for {retry_after}s "
+        f"(attempt {attempt + 1}/{retries + 1})"
+    )
+    return False
+
+class BotApiClient:
+    """Blocking Bot API client: one pooled session, shared rate limits, flood-control retries"""
+
+    def __init__(self, base_url: str = BASE_URL, pool_size: int = HTTP_POOL_SIZE, limiter: RateLimiter = rate_limiter):
+        self.base_url = base_url
+        # Telegram's limits apply per bot, so each token gets its own limiter
+        self.limiter = limiter
+        self.session = self.create_session(pool_size)
+
+    def create_session(self, pool_size: int = HTTP_POOL_SIZE) -> requests.Session:
+        """Create a keep-alive session shared by every API call"""
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def make_request(self, method: str, params: dict = None, timeout: float = 10,
+                     retries: int = FLOOD_MAX_RETRIES, body: bytes = None, cost: int = 1) -> dict:
+        """Make a request to Telegram API
+
+        body, when given, is a pre-serialised JSON request sent instead of
+        params; params then only needs the chat_id used for rate limiting.
+        cost is the number of messages the call counts as (album size).
+        """
+        url = f"{self.base_url}/{method}"
+        params = params or {}
+        if body is None:
+            payload = {"json": params}
+        else:
+            payload = {"data": body, "headers": JSON_HEADERS}
+
+        for attempt in range(retries + 1):
+            if method not in UNTHROTTLED_METHODS:
+                api_metrics.record_wait(method, self.limiter.wait(params.get("chat_id"), cost))
+            started = time.monotonic()
+            try:
+                result = parse_response(self.session.post(url, timeout=timeout, **payload))
+            except requests.exceptions.Timeout as e:
+                return request_failed(method, started, e, timed_out=True)
+            except requests.exceptions.RequestException as e:
+                return request_failed(method, started, e)
+
+            if settle_response(method, result, started, self.limiter, attempt, retries):
+                return result
+
+    def send_prepared(self, chat_id: int, prepared: PreparedBroadcast) -> dict:
+        """Send a prepared broadcast to one chat"""
+        return self.make_request(
+            prepared.method, {"chat_id": chat_id},
+            body=prepared.body_for(chat_id), cost=prepared.cost
+        )
@@ -0,0 +1,163 @@
+import logging
+from collections import Counter
+from itertools import chain, zip_longest
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from config import BOT_TOKENS, POOL_STAGING_CHAT_ID, BROADCAST_CONCURRENCY, TELEGRAM_API_URL
+from broadcast import BroadcastEngine, PreparedBroadcast
+from bot_api import BotApiClient
+from rate_limit import RateLimiter
+from utils import GroupManager
+
+logger = logging.getLogger(__name__)
+
+# getChatMember statuses that mean the bot is in the group
+MEMBER_STATUSES = {"creator", "administrator", "member", "restricted"}
+
+def is_membership_error(result: dict) -> bool:
+    """Check whether a send failed because the bot is no longer in the chat"""
+    text = str(result).lower()
+    return any(reason in text for reason in ("chat not found", "bot was blocked", "bot was kicked", "not a member"))
+
+def _interleave(lanes: Iterable[List[int]]) -> Iterator[int]:
+    """Round-robin over the lanes, so every bot's budget is in use from the start"""
+    gap = object()
+    return (chat_id for chat_id in chain.from_iterable(zip_longest(*lanes, fillvalue=gap)) if chat_id is not gap)
+
+class BotPool:
+    """The primary bot plus extra bot tokens that share the broadcast load
+
+    Each group is assigned to one bot that is a member there (None is the
+    primary bot, which tracks every group). Every bot has its own
+    RateLimiter, since Telegram's limits are per bot, so aggregate
+    throughput grows with the number of bots.
+
+    File ids only work for the bot that received them, so media is first
+    posted to POOL_STAGING_CHAT_ID by the primary bot; the other bots copy
+    it from there. Without a staging chat, media goes out from the primary
+    bot only.
+    """
+
+    def __init__(self, primary: BotApiClient, group_manager: GroupManager, tokens: List[str] = BOT_TOKENS,
+                 staging_chat_id: Optional[int] = POOL_STAGING_CHAT_ID):
+        self.primary = primary
+        self.group_manager = group_manager
+        self.tokens = tokens
+        self.staging_chat_id = staging_chat_id
+        self.bots: Dict[int, BotApiClient] = {}
+        self.usernames: Dict[int, str] = {}
+        self.engine = None
+
+    def start(self):
+        """Look up every extra token's bot; tokens that don't work are skipped"""
+        for token in self.tokens:
+            client = BotApiClient(f"{TELEGRAM_API_URL}/bot{token}", limiter=RateLimiter())
+            me = client.make_request("getMe")
+            if not me.get("ok"):
+                logger.error(f"Skipping pool bot token ending ...{token[-4:]}: {me}")
+                continue
+            bot = me["result"]
+            self.bots[bot["id"]] = client
+            self.usernames[bot["id"]] = bot["username"]
+            logger.info(f"Pool bot ready: @{bot['username']} ({bot['id']})")
+
+        if self.bots:
+            # Enough threads to keep every bot's budget busy
+            self.engine = BroadcastEngine(BROADCAST_CONCURRENCY * (len(self.bots) + 1))
+            if not self.staging_chat_id:
+                logger.warning("POOL_STAGING_CHAT_ID not set; media broadcasts will use the primary bot only")
+
+    def bot_id_for(self, username: str) -> Optional[int]:
+        """Pool bot with the given username, if any"""
+        return next((bot_id for bot_id, name in self.usernames.items() if name == username), None)
+
+    def client_for(self, bot_id: Optional[int]) -> BotApiClient:
+        return self.bots.get(bot_id, self.primary)
+
+    def loads(self) -> Counter:
+        """Active groups per bot (None is the primary bot)"""
+        return Counter(self.group_manager.get_bot_assignments().values())
+
+    def assign(self, chat_id: int, candidates: Iterable[Optional[int]], loads: Counter = None) -> Optional[int]:
+        """Give a group to whichever candidate bot currently has the fewest groups"""
+        loads = self.loads() if loads is None else loads
+        bot_id = min(candidates, key=lambda candidate: loads[candidate])
+        self.group_manager.assign_bot(chat_id, bot_id)
+        return bot_id
+
+    def discover(self, chat_ids: Iterable[int]) -> int:
+        """Ask Telegram which pool bots are in each group and rebalance; return groups reassigned"""
+        assignments = self.group_manager.get_bot_assignments()
+        loads = Counter(assignments.values())
+        moved = 0
+        for chat_id in chat_ids:
+            present = [None]
+            for bot_id in self.bots:
+                member = self.primary.make_request("getChatMember", {"chat_id": chat_id, "user_id": bot_id})
+                if member.get("ok") and member["result"].get("status") in MEMBER_STATUSES:
+                    present.append(bot_id)
+            before = assignments.get(chat_id)
+            loads[before] -= 1
+            after = self.assign(chat_id, present, loads)
+            loads[after] += 1
+            moved += after != before
+        self.group_manager.flush()
+        return moved
+
+    def prepare(self, prepared: PreparedBroadcast) -> Dict[Optional[int], PreparedBroadcast]:
+        """The request each bot should send; bots missing from the result fall back to the primary"""
+        per_bot = {None: prepared}
+        if not self.bots:
+            return per_bot
+        if prepared.method == "sendMessage":
+            # Plain text carries no file ids and works for any bot
+            return dict.fromkeys(chain([None], self.bots), prepared)
+        if not self.staging_chat_id:
+            return per_bot
+
+        staged = self.primary.send_prepared(self.staging_chat_id, prepared)
+        if not staged.get("ok"):
+            logger.error(f"Could not stage broadcast in {self.staging_chat_id}, using the primary bot only: {staged}")
+            return per_bot
+        if prepared.method == "sendMediaGroup":
+            copy = PreparedBroadcast("copyMessages", {
+                "from_chat_id": self.staging_chat_id,
+                "message_ids": [message["message_id"] for message in staged["result"]]
+            })
+        else:
+            copy = PreparedBroadcast("copyMessage", {
+                "from_chat_id": self.staging_chat_id,
+                "message_id": staged["result"]["message_id"]
+            })
+        per_bot.update(dict.fromkeys(self.bots, copy))
+        return per_bot
+
+    def fan_out(self, targets: List[int], prepared: PreparedBroadcast,
+                gate: Callable[[Iterable[int]], Iterable[int]] = iter) -> Iterator[Tuple[int, dict]]:
+        """Send to every target from its assigned bot, yielding (chat_id, result) as each completes
+
+        The send order is passed through gate, which may hold targets back
+        (see BroadcastLanes.gated).
+        """
+        per_bot = self.prepare(prepared)
+        assignments = self.group_manager.get_bot_assignments()
+        routes = {}
+        lanes: Dict[Optional[int], List[int]] = {}
+        for chat_id in targets:
+            bot_id = assignments.get(chat_id)
+            if bot_id not in per_bot:
+                bot_id = None
+            routes[chat_id] = bot_id
+            lanes.setdefault(bot_id, []).append(chat_id)
+
+        def send(chat_id: int) -> dict:
+            bot_id = routes[chat_id]
+            result = self.client_for(bot_id).send_prepared(chat_id, per_bot[bot_id])
+            if bot_id is not None and not result.get("ok") and is_membership_error(result):
+                # That pool bot has left the group; hand it back to the primary bot
+                logger.warning(f"Pool bot {bot_id} can't reach group {chat_id}, using the primary bot")
+                self.group_manager.assign_bot(chat_id, None)
+                result = self.primary.send_prepared(chat_id, per_bot[None])
+            return result
+
+        return self.engine.fan_out(gate(_interleave(lanes.values())), send)
@@ -0,0 +1,288 @@
+import asyncio
+import json
+import logging
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from itertools import chain
+from typing import AsyncIterator, Awaitable, Callable, Iterable, Iterator, List, Tuple
+
+from config import BROADCAST_CONCURRENCY, BROADCAST_PROGRESS_INTERVAL, FLOOD_MAX_RETRIES
+from rate_limit import is_flood_limited
+
+logger = logging.getLogger(__name__)
+
+SIGNATURE = "— DRCT NEWS"
+
+# Message kinds whose caption copyMessage can replace
+CAPTIONED_TYPES = ("photo", "video", "document", "animation", "audio", "voice")
+
+def with_signature(text: str) -> str:
+    """Append the bot signature to a caption or message text"""
+    if text:
+        return f"{text}\n\n{SIGNATURE}"
+    return SIGNATURE
+
+def prepare_broadcast(message: dict) -> Tuple[str, dict]:
+    """Build the API method and parameters (minus chat_id) that re-send an admin message as the bot
+
+    Everything is worked out once per broadcast, and every message type
+    maps to a single request per group: text is re-sent with the signature
+    appended, media is copied server-side with the signed caption, and any
+    other type (stickers, polls, locations...) is copied as is.
+    """
+    if "text" in message:
+        text = with_signature(message["text"])
+        params = {"text": text[:4096]}  # Telegram message limit
+        if message.get("entities") and len(text) <= 4096:
+            params["entities"] = message["entities"]
+        return "sendMessage", params
+
+    params = {
+        "from_chat_id": message["chat"]["id"],
+        "message_id": message["message_id"]
+    }
+    if any(kind in message for kind in CAPTIONED_TYPES):
+        caption = with_signature(message.get("caption", ""))
+        params["caption"] = caption[:1024]  # Telegram caption limit
+        if message.get("caption_entities") and len(caption) <= 1024:
+            params["caption_entities"] = message["caption_entities"]
+    return "copyMessage", params
+
+def _drain(queue: deque) -> Iterator[int]:
+    """Pop items off the front of a deque until it is empty"""
+    while queue:
+        yield queue.popleft()
+
+# Message kinds that can be part of an album, in sendMediaGroup's terms
+ALBUM_TYPES = ("photo", "video", "document", "audio")
+
+def prepare_album(messages: List[dict]) -> Tuple[str, dict]:
+    """Build a single sendMediaGroup request (minus chat_id) for a whole album
+
+    The signature goes on the captioned item (or the first one if none is
+    captioned), which is the caption Telegram shows for the album.
+    """
+    signed = next((i for i, m in enumerate(messages) if m.get("caption")), 0)
+    media = []
+    for i, message in enumerate(messages):
+        kind = next(kind for kind in ALBUM_TYPES if kind in message)
+        file = message[kind]
+        if kind == "photo":
+            # Photos come as a list of sizes; the last one is the largest
+            file = file[-1]
+        item = {"type": kind, "media": file["file_id"]}
+
+        caption = message.get("caption", "")
+        if i == signed:
+            caption = with_signature(caption)
+        if caption:
+            item["caption"] = caption[:1024]  # Telegram caption limit
+            if message.get("caption_entities") and len(caption) <= 1024:
+                item["caption_entities"] = message["caption_entities"]
+        media.append(item)
+
+    return "sendMediaGroup", {"media": media}
+
+class PreparedBroadcast:
+    """A broadcast request with everything but chat_id worked out and serialised up front
+
+    Parsing, signature, truncation and JSON encoding happen once; each
+    target only costs splicing its chat_id onto the pre-encoded body.
+    """
+
+    __slots__ = ('method', 'params', 'cost', 'body_tail')
+
+    def __init__(self, method: str, params: dict):
+        self.method = method
+        self.params = params
+        # Telegram counts every album item against the rate limits
+        self.cost = len(params.get("media") or params.get("message_ids") or ()) or 1
+        body = json.dumps(params, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        # Drop the opening brace so chat_id can be put in front of the other fields
+        self.body_tail = b',' + body[1:] if params else b'}'
+
+    @classmethod
+    def from_message(cls, message: dict) -> 'PreparedBroadcast':
+        return cls(*prepare_broadcast(message))
+
+    @classmethod
+    def from_album(cls, messages: List[dict]) -> 'PreparedBroadcast':
+        return cls(*prepare_album(messages))
+
+    def body_for(self, chat_id: int) -> bytes:
+        """JSON request body for one target chat"""
+        return b'{"chat_id":%d%s' % (chat_id, self.body_tail)
+
+def format_duration(seconds: float) -> str:
+    """Render a duration as e.g. 45s, 3m 20s or 1h 05m"""
+    seconds = int(seconds)
+    if seconds < 60:
+        return f"{seconds}s"
+    if seconds < 3600:
+        return f"{seconds // 60}m {seconds % 60:02d}s"
+    return f"{seconds // 3600}h {seconds % 3600 // 60:02d}m"
+
+class BroadcastProgress:
+    """Running totals of a broadcast, plus a throttle for reporting them
+
+    A resumed job starts from the counts it had already reached; throughput
+    and ETA are measured over this run only. due() returns True at most
+    once every interval seconds, so the status message is edited on a fixed
+    cadence however fast the sends complete.
+    """
+
+    __slots__ = ('total', 'sent', 'failed', 'interval', 'started', 'completed', 'last_report')
+
+    def __init__(self, total: int, sent: int = 0, failed: int = 0, interval: float = BROADCAST_PROGRESS_INTERVAL):
+        self.total = total
+        self.sent = sent
+        self.failed = failed
+        self.interval = interval
+        self.started = time.monotonic()
+        self.completed = 0
+        self.last_report = self.started
+
+    def record(self, ok: bool):
+        if ok:
+            self.sent += 1
+        else:
+            self.failed += 1
+        self.completed += 1
+
+    @property
+    def remaining(self) -> int:
+        return max(0, self.total - self.sent - self.failed)
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    @property
+    def throughput(self) -> float:
+        """Sends completed per second in this run"""
+        elapsed = self.elapsed
+        return self.completed / elapsed if elapsed > 0 else 0.0
+
+    @property
+    def eta(self) -> float:
+        """Seconds until the remaining targets are done at the current rate"""
+        throughput = self.throughput
+        return self.remaining / throughput if throughput > 0 else 0.0
+
+    def due(self) -> bool:
+        """True if a progress report is due (and counts it as made)"""
+        now = time.monotonic()
+        if not self.remaining or now - self.last_report < self.interval:
+            return False
+        self.last_report = now
+        return True
+
+class BroadcastEngine:
+    """Fan a single message out to many chats with bounded concurrency"""
+
+    def __init__(self, concurrency: int = BROADCAST_CONCURRENCY, max_requeues: int = FLOOD_MAX_RETRIES):
+        self.concurrency = max(1, concurrency)
+        self.max_requeues = max_requeues
+        self.executor = ThreadPoolExecutor(
+            max_workers=self.concurrency,
+            thread_name_prefix="broadcast"
+        )
+
+    def _send(self, send: Callable[[int], dict], chat_id: int) -> dict:
+        """Run one send, turning unexpected exceptions into a failed result"""
+        try:
+            return send(chat_id)
+        except Exception as e:
+            logger.error(f"Unexpected error for group {chat_id}: {e}")
+            return {"ok": False, "error": str(e)}
+
+    def fan_out(self, targets: Iterable[int], send: Callable[[int], dict]) -> Iterator[Tuple[int, dict]]:
+        """Send to every target, yielding (chat_id, result) as each send completes
+
+        Only a small window of sends is kept in flight so that very large
+        audiences don't queue one future per group up front. Results are
+        yielded in the caller's thread, so callers can update shared state
+        (counters, GroupManager) without extra locking. Sends that are
+        still flood-limited after make_request's own retries are requeued
+        behind the remaining targets instead of being reported as failed.
+        """
+        pending = {}
+        requeued = deque()
+        attempts = {}
+        targets = iter(targets)
+        window = self.concurrency * 2
+
+        while True:
+            for chat_id in chain(targets, _drain(requeued)):
+                pending[self.executor.submit(self._send, send, chat_id)] = chat_id
+                if len(pending) >= window:
+                    break
+
+            if not pending:
+                return
+
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                chat_id = pending.pop(future)
+                result = future.result()
+                if is_flood_limited(result) and attempts.get(chat_id, 0) < self.max_requeues:
+                    attempts[chat_id] = attempts.get(chat_id, 0) + 1
+                    requeued.append(chat_id)
+                    logger.warning(f"Requeued group {chat_id} after flood limit")
+                    continue
+                yield chat_id, result
+
+    def shutdown(self):
+        """Stop the worker threads"""
+        self.executor.shutdown(wait=False)
+
+async def fan_out_async(targets: Iterable[int], send: Callable[[int], Awaitable],
+                        concurrency: int = BROADCAST_CONCURRENCY,
+                        max_requeues: int = FLOOD_MAX_RETRIES) -> AsyncIterator[Tuple[int, object]]:
+    """asyncio counterpart of BroadcastEngine.fan_out: yield (chat_id, result) as each send completes
+
+    A fixed set of worker tasks pulls targets from one shared iterator, so
+    only concurrency sends (and tasks) exist at a time however large the
+    audience. An exception raised by send is yielded as that target's
+    result. Flood-limited result dicts are requeued like in fan_out.
+    """
+    targets = iter(targets)
+    requeued = deque()
+    attempts = {}
+    results = asyncio.Queue(maxsize=max(1, concurrency))
+    finished = object()
+
+    async def worker():
+        try:
+            for chat_id in chain(targets, _drain(requeued)):
+                try:
+                    result = await send(chat_id)
+                except Exception as e:
+                    result = e
+                if isinstance(result, dict) and is_flood_limited(result) and attempts.get(chat_id, 0) < max_requeues:
+                    attempts[chat_id] = attempts.get(chat_id, 0) + 1
+                    requeued.append(chat_id)
+                    logger.warning(f"Requeued group {chat_id} after flood limit")
+                    continue
+                await results.put((chat_id, result))
+        except Exception as e:
+            # The targets themselves failed; hand the error to the caller
+            await results.put(e)
+        else:
+            await results.put(finished)
+
+    workers = [asyncio.create_task(worker()) for _ in range(max(1, concurrency))]
+    try:
+        running = len(workers)
+        while running:
+            item = await results.get()
+            if item is finished:
+                running -= 1
+            elif isinstance(item, Exception):
+                raise item
+            else:
+                yield item
+    finally:
+        for task in workers:
+            task.cancel()
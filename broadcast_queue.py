@@ -0,0 +1,99 @@
+import logging
+import queue
+import re
+import threading
+import time
+from typing import Callable, Dict, Iterable, Iterator
+
+from config import URGENT_HASHTAGS
+from broadcast import PreparedBroadcast
+from jobs import BroadcastJob
+from metrics import lane_metrics
+
+logger = logging.getLogger(__name__)
+
+URGENT = "urgent"
+ROUTINE = "routine"
+LANES = (URGENT, ROUTINE)  # highest priority first
+
+def lane_for(prepared: PreparedBroadcast, hashtags=URGENT_HASHTAGS) -> str:
+    """Urgent if the broadcast's text or any caption carries one of the urgent hashtags"""
+    params = prepared.params
+    texts = [params.get("text"), params.get("caption")]
+    texts += [item.get("caption") for item in params.get("media") or ()]
+    text = " ".join(filter(None, texts)).lower()
+    if any(re.search(re.escape(tag) + r"(?!\w)", text) for tag in hashtags):
+        return URGENT
+    return ROUTINE
+
+class BroadcastLanes:
+    """Priority lanes for broadcast jobs
+
+    Each lane runs its jobs one at a time, in order, on its own thread, so
+    a breaking-news job never waits for a routine one to finish. Routine
+    targets are pulled through gated(), which holds them back while an
+    urgent job is queued or running; urgent sends then get the whole send
+    budget, apart from the few routine sends already in flight. A held job
+    loses nothing: every delivery is already recorded in the JobStore, and
+    the rest of its targets carry on once the urgent lane is empty.
+    """
+
+    def __init__(self, run: Callable[[BroadcastJob, str], None]):
+        self.run = run
+        self.changed = threading.Condition()
+        self.queues: Dict[str, queue.Queue] = {lane: queue.Queue() for lane in LANES}
+        self.busy = dict.fromkeys(LANES, 0)  # jobs queued or running per lane
+        for lane in LANES:
+            threading.Thread(target=self.work, args=(lane,), name=f"broadcast-{lane}", daemon=True).start()
+
+    def submit(self, job: BroadcastJob, lane: str = None) -> str:
+        """Queue a job in its lane (worked out from the message if not given) and return the lane"""
+        lane = lane or lane_for(job.prepared)
+        with self.changed:
+            self.busy[lane] += 1
+        lane_metrics.queued(lane)
+        self.queues[lane].put((job, time.monotonic()))
+        logger.info(f"Queued broadcast job {job.id} in the {lane} lane")
+        return lane
+
+    def work(self, lane: str):
+        while True:
+            job, queued_at = self.queues[lane].get()
+            lane_metrics.started(lane, time.monotonic() - queued_at)
+            try:
+                self.run(job, lane)
+            except Exception as e:
+                logger.error(f"Broadcast job {job.id} failed in the {lane} lane: {e}")
+            finally:
+                with self.changed:
+                    self.busy[lane] -= 1
+                    self.changed.notify_all()
+                lane_metrics.queued(lane, -1)
+
+    def outranked(self, lane: str) -> bool:
+        """Whether a higher-priority lane has work (call with the condition held)"""
+        return any(self.busy[higher] for higher in LANES[:LANES.index(lane)])
+
+    def gated(self, lane: str, targets: Iterable[int]) -> Iterator[int]:
+        """Yield targets in order, pausing whenever a higher-priority lane has work"""
+        for chat_id in targets:
+            with self.changed:
+                if self.outranked(lane):
+                    logger.info(f"Pausing {lane} broadcast for a higher-priority one")
+                    held = time.monotonic()
+                    while self.outranked(lane):
+                        self.changed.wait()
+                    lane_metrics.preempted(lane, time.monotonic() - held)
+                    logger.info(f"Resuming {lane} broadcast")
+            yield chat_id
+
+    def pending(self) -> int:
+        """Jobs queued or running across all lanes"""
+        with self.changed:
+            return sum(self.busy.values())
+
+    def wait_idle(self):
+        """Block until every lane is empty"""
+        with self.changed:
+            while any(self.busy.values()):
+                self.changed.wait()
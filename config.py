@@ -5,4 +5,55 @@ load_dotenv()
 BOT_TOKEN = os.getenv("BOT_TOKEN")
 ADMIN_ID = int(os.getenv("ADMIN_ID"))
 GROUPS_FILE = "groups.json"
+GROUPS_BACKEND = os.getenv("GROUPS_BACKEND", "sqlite")  # "sqlite" or "json"
+DB_FILE = os.getenv("DB_FILE", "drct_news.db")
+GROUPS_FLUSH_INTERVAL = float(os.getenv("GROUPS_FLUSH_INTERVAL", "5"))  # seconds, JSON backend only
 BOT_USERNAME = os.getenv("BOT_USERNAME", "drctnewsbot")
+# Extra bot tokens (comma separated) that share the broadcast load, each with its own rate limits
+BOT_TOKENS = [token.strip() for token in os.getenv("BOT_TOKENS", "").split(",") if token.strip()]
+# Chat every pool bot belongs to; media is re-posted there so the other bots can copy it
+POOL_STAGING_CHAT_ID = int(os.getenv("POOL_STAGING_CHAT_ID", "0")) or None
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL", "https://api.telegram.org").rstrip("/")  # e.g. a local Bot API server
+
+# Broadcasting
+BROADCAST_CONCURRENCY = int(os.getenv("BROADCAST_CONCURRENCY", "8"))
+# Worker processes for large broadcasts (0 or 1 keeps every send in the bot process)
+BROADCAST_PROCESSES = int(os.getenv("BROADCAST_PROCESSES", "0"))
+BROADCAST_SHARD_MIN = int(os.getenv("BROADCAST_SHARD_MIN", "5000"))  # smallest audience worth sharding
+# Groups per unit of work handed to a worker; also how many sends per worker an urgent broadcast may wait behind
+BROADCAST_SHARD_SIZE = int(os.getenv("BROADCAST_SHARD_SIZE", "500"))
+BROADCAST_PROGRESS_INTERVAL = float(os.getenv("BROADCAST_PROGRESS_INTERVAL", "5"))  # seconds between status edits
+# Hashtags that send a broadcast through the urgent lane, ahead of routine ones
+URGENT_HASHTAGS = [tag.strip().lower() for tag in os.getenv("URGENT_HASHTAGS", "#breaking,#urgent").split(",") if tag.strip()]
+
+# Scheduled broadcasts
+SCHEDULE_TIMEZONE = os.getenv("SCHEDULE_TIMEZONE", "Asia/Kolkata")  # for clock times like 18:30
+SCHEDULE_MIN_GAP = float(os.getenv("SCHEDULE_MIN_GAP", "60"))  # seconds between back-to-back scheduled drops
+
+# Rate limits (Telegram allows ~30 msgs/sec overall, ~1/sec per chat, 20/min per group)
+RATE_LIMIT_GLOBAL = float(os.getenv("RATE_LIMIT_GLOBAL", "30"))
+RATE_LIMIT_PER_CHAT = float(os.getenv("RATE_LIMIT_PER_CHAT", "1"))
+RATE_LIMIT_PER_GROUP = float(os.getenv("RATE_LIMIT_PER_GROUP", "20"))
+RATE_LIMIT_BURST = int(os.getenv("RATE_LIMIT_BURST", "3"))
+FLOOD_MAX_RETRIES = int(os.getenv("FLOOD_MAX_RETRIES", "3"))
+
+# HTTP connection pool for the raw Bot API client
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", str(max(BROADCAST_CONCURRENCY, 10))))
+
+# Web server (keep-alive, webhook)
+PORT = int(os.getenv("PORT", "8080"))
+WEBHOOK_URL = os.getenv("WEBHOOK_URL")  # public base URL; enables webhook mode when set
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/webhook")
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET")  # generated at startup when unset
+HEALTH_STALL_AFTER = float(os.getenv("HEALTH_STALL_AFTER", "120"))  # seconds without a good getUpdates before /healthz fails
+
+# Long polling
+POLL_TIMEOUT = int(os.getenv("POLL_TIMEOUT", "50"))  # seconds Telegram holds getUpdates open
+POLL_LIMIT = int(os.getenv("POLL_LIMIT", "100"))
+POLL_BACKOFF_MAX = float(os.getenv("POLL_BACKOFF_MAX", "60"))
+UPDATE_WORKERS = int(os.getenv("UPDATE_WORKERS", "4"))
+ALBUM_WINDOW = float(os.getenv("ALBUM_WINDOW", "1.5"))  # seconds to wait for the rest of an album
+
+# Update deduplication (Telegram keeps undelivered updates for 24h)
+DEDUP_CAPACITY = int(os.getenv("DEDUP_CAPACITY", "10000"))
+DEDUP_TTL = float(os.getenv("DEDUP_TTL", str(48 * 3600)))
@@ -0,0 +1,68 @@
+import logging
+import queue
+import threading
+from collections import deque
+from typing import Callable, Dict
+
+from config import UPDATE_WORKERS
+
+logger = logging.getLogger(__name__)
+
+def update_chat_id(update: dict):
+    """Chat an update belongs to, used to keep each chat's updates in order"""
+    message = update.get("message") or {}
+    return message.get("chat", {}).get("id", update.get("update_id"))
+
+class UpdateDispatcher:
+    """Process updates on a worker pool, one at a time per chat
+
+    Each chat has its own FIFO; a chat is on the ready queue at most once,
+    so its updates are handled strictly in order while different chats run
+    in parallel. A long broadcast only occupies the worker handling that
+    admin's chat, and submit() never blocks the poller.
+    """
+
+    def __init__(self, handler: Callable[[dict], None], workers: int = UPDATE_WORKERS):
+        self.handler = handler
+        self.lock = threading.Lock()
+        self.chats: Dict[int, deque] = {}
+        self.ready = queue.Queue()
+        self.queued = 0
+        for i in range(max(1, workers)):
+            threading.Thread(target=self.work, name=f"updates-{i}", daemon=True).start()
+
+    def submit(self, update: dict):
+        """Queue an update for processing"""
+        key = update_chat_id(update)
+        with self.lock:
+            self.queued += 1
+            pending = self.chats.get(key)
+            if pending is not None:
+                pending.append(update)
+                return
+            self.chats[key] = deque([update])
+        self.ready.put(key)
+
+    def pending(self) -> int:
+        """Number of updates queued or being processed"""
+        return self.queued
+
+    def work(self):
+        while True:
+            key = self.ready.get()
+            with self.lock:
+                update = self.chats[key][0]
+
+            try:
+                self.handler(update)
+            except Exception as e:
+                logger.error(f"Error processing update {update.get('update_id')}: {e}")
+
+            with self.lock:
+                self.queued -= 1
+                pending = self.chats[key]
+                pending.popleft()
+                if not pending:
+                    del self.chats[key]
+                    continue
+            self.ready.put(key)
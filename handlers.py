@@ -1,15 +1,21 @@
+import asyncio
 import logging
-from telegram import Update, Bot
+from telegram import Update, Bot, MessageEntity
 from telegram.ext import ContextTypes
-from telegram.error import TelegramError, Forbidden, BadRequest
-from config import ADMIN_ID
+from telegram.error import TelegramError, Forbidden
+from config import ADMIN_ID, BROADCAST_CONCURRENCY
 from utils import GroupManager
+from broadcast import BroadcastProgress, PreparedBroadcast, fan_out_async, format_duration
+from jobs import JobStore, BroadcastJob, BroadcastRun
+from update_log import UpdateLog
 
 logger = logging.getLogger(__name__)
 
 class BotHandlers:
     def __init__(self):
         self.group_manager = GroupManager()
+        self.jobs = JobStore()
+        self.update_log = UpdateLog()
     
     async def start_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /start command"""
@@ -107,9 +113,10 @@ class BotHandlers:
         """Handle bot being added to or removed from groups"""
         chat = update.effective_chat
         
+        bot_user = context.bot_data["bot_user"]
+        
         # Check if bot was added to group
         if update.message and update.message.new_chat_members:
-            bot_user = await context.bot.get_me()
             for member in update.message.new_chat_members:
                 if member.id == bot_user.id:
                     # Bot was added to group
@@ -122,7 +129,6 @@ class BotHandlers:
         
         # Check if bot was removed from group
         if update.message and update.message.left_chat_member:
-            bot_user = await context.bot.get_me()
             if update.message.left_chat_member.id == bot_user.id:
                 # Bot was removed from group
                 self.group_manager.remove_group(chat.id)
@@ -141,6 +147,11 @@ class BotHandlers:
         if message.text and message.text.startswith('/'):
             return
         
+        # Pending updates are redelivered after a restart; never broadcast one twice
+        if not self.update_log.claim(message.chat_id, message.message_id):
+            logger.info(f"Skipping already broadcast message {message.message_id}")
+            return
+        
         active_groups = self.group_manager.get_active_groups()
         
         if not active_groups:
@@ -150,36 +161,55 @@ class BotHandlers:
             )
             return
         
-        success_count = 0
-        failed_count = 0
-        failed_groups = []
-        
-        # Broadcast to all active groups
-        for group_id in active_groups:
-            try:
-                # Forward the message to the group
-                await message.forward(group_id)
-                success_count += 1
-                logger.info(f"Message forwarded to group {group_id}")
-                
-            except Forbidden:
-                # Bot was blocked or removed
-                self.group_manager.deactivate_group(group_id)
-                failed_count += 1
-                failed_groups.append(group_id)
-                logger.warning(f"Bot blocked in group {group_id}")
-                
-            except BadRequest as e:
-                # Other errors (insufficient permissions, etc.)
-                failed_count += 1
-                failed_groups.append(group_id)
-                logger.error(f"Failed to send to group {group_id}: {e}")
-                
-            except Exception as e:
-                # Unexpected errors
-                failed_count += 1
-                failed_groups.append(group_id)
-                logger.error(f"Unexpected error for group {group_id}: {e}")
+        # Persist the job before sending so a restart can pick up where it left off
+        prepared = PreparedBroadcast("forwardMessage", {
+            "from_chat_id": message.chat_id,
+            "message_id": message.message_id
+        })
+        job = self.jobs.create_job(message.chat_id, prepared, active_groups)
+        
+        status_message = await message.reply_text(f"📤 Broadcasting to {len(active_groups)} groups...")
+        self.jobs.set_status_message(job, status_message.message_id)
+        await self.run_broadcast_job(context.bot, job)
+    
+    async def send_prepared(self, bot: Bot, chat_id: int, prepared: PreparedBroadcast):
+        """Send a stored broadcast request through PTB's own method for it, where there is one"""
+        params = prepared.params
+        if prepared.method == "forwardMessage":
+            return await bot.forward_message(chat_id, params["from_chat_id"], params["message_id"])
+        if prepared.method == "copyMessage":
+            entities = params.get("caption_entities")
+            return await bot.copy_message(
+                chat_id, params["from_chat_id"], params["message_id"],
+                caption=params.get("caption"),
+                caption_entities=MessageEntity.de_list(entities, bot) if entities else None
+            )
+        # Methods PTB has no wrapper for go out as they were stored
+        return await bot.do_api_request(prepared.method, api_kwargs={"chat_id": chat_id, **params})
+    
+    async def edit_status_message(self, bot: Bot, job: BroadcastJob, text: str):
+        """Replace the text of a job's status message, if it has one"""
+        if not job.status_message_id:
+            return
+        try:
+            await bot.edit_message_text(
+                text, chat_id=job.admin_chat_id, message_id=job.status_message_id, parse_mode='Markdown'
+            )
+        except TelegramError as e:
+            logger.warning(f"Could not update broadcast status: {e}")
+    
+    async def run_broadcast_job(self, bot: Bot, job: BroadcastJob):
+        """Send a job to its pending targets, recording each delivery as it happens"""
+        with BroadcastRun(self.jobs, job, self.group_manager) as run:
+            # Broadcast to all pending groups from a fixed set of workers; the shared rate limiter paces the sends
+            send = lambda group_id: self.send_prepared(bot, group_id, job.prepared)
+            async for group_id, result in fan_out_async(run.targets, send, BROADCAST_CONCURRENCY):
+                failed = isinstance(result, Exception)
+                # Forbidden: the bot was blocked or removed from the group
+                if run.record(group_id, not failed, result if failed else None, isinstance(result, Forbidden)):
+                    await self.edit_status_message(bot, job, self.progress_text(run.progress))
+            
+            success_count, failed_count = await asyncio.to_thread(run.finish)
         
         # Send status update to admin
         status_text = f"📤 *Broadcast Complete*\n\n"
@@ -189,4 +219,24 @@ class BotHandlers:
             status_text += f"❌ Failed: {failed_count} groups\n"
             status_text += f"💡 Failed groups have been deactivated"
         
-        await message.reply_text(status_text, parse_mode='Markdown')
+        if job.status_message_id:
+            await self.edit_status_message(bot, job, status_text)
+        else:
+            await bot.send_message(job.admin_chat_id, status_text, parse_mode='Markdown')
+    
+    def progress_text(self, progress: BroadcastProgress) -> str:
+        """Build the live status shown while a broadcast runs"""
+        progress_text = f"📤 *Broadcasting...*\n\n"
+        progress_text += f"✅ Sent: {progress.sent}\n"
+        progress_text += f"❌ Failed: {progress.failed}\n"
+        progress_text += f"⏳ Remaining: {progress.remaining} / {progress.total}\n"
+        progress_text += f"⚡ Speed: {progress.throughput:.1f} msgs/sec\n"
+        progress_text += f"🕒 ETA: {format_duration(progress.eta)}"
+        return progress_text
+    
+    async def resume_broadcasts(self, bot: Bot):
+        """Finish broadcasts interrupted by a crash or redeploy"""
+        self.jobs.prune()
+        for job in self.jobs.unfinished_jobs():
+            logger.info(f"Resuming broadcast job {job.id}")
+            await self.run_broadcast_job(bot, job)
@@ -0,0 +1,193 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+from typing import Iterable, List, Optional, Tuple
+
+from config import DB_FILE
+from broadcast import BroadcastProgress, PreparedBroadcast
+from metrics import api_metrics, bot_status
+from utils import GroupManager
+
+logger = logging.getLogger(__name__)
+
+# Delivery state of one target
+PENDING = 0
+SENT = 1
+FAILED = 2
+
+class BroadcastJob:
+    """A persisted broadcast: what to send, who asked for it, and where to report progress"""
+
+    __slots__ = ('id', 'admin_chat_id', 'prepared', 'status_message_id')
+
+    def __init__(self, id: int, admin_chat_id: int, prepared: PreparedBroadcast, status_message_id: Optional[int]):
+        self.id = id
+        self.admin_chat_id = admin_chat_id
+        self.prepared = prepared
+        self.status_message_id = status_message_id
+
+class JobStore:
+    """Broadcast jobs with per-target delivery state, stored in SQLite
+
+    Every target's outcome is written as soon as it is known, so after a
+    crash or redeploy a job resumes with exactly the targets that were
+    never delivered.
+    """
+
+    def __init__(self, path: str = DB_FILE):
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS broadcast_jobs ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " admin_chat_id INTEGER NOT NULL,"
+            " method TEXT NOT NULL,"
+            " params TEXT NOT NULL,"
+            " status_message_id INTEGER,"
+            " created REAL NOT NULL,"
+            " finished REAL)"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS broadcast_targets ("
+            " job_id INTEGER NOT NULL,"
+            " chat_id INTEGER NOT NULL,"
+            " state INTEGER NOT NULL DEFAULT 0,"
+            " PRIMARY KEY (job_id, chat_id)) WITHOUT ROWID"
+        )
+
+    def create_job(self, admin_chat_id: int, prepared: PreparedBroadcast, targets: Iterable[int],
+                   status_message_id: Optional[int] = None) -> BroadcastJob:
+        """Persist a new job with all of its targets pending"""
+        with self.lock:
+            self.conn.execute("BEGIN")
+            cursor = self.conn.execute(
+                "INSERT INTO broadcast_jobs (admin_chat_id, method, params, status_message_id, created) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (admin_chat_id, prepared.method, json.dumps(prepared.params), status_message_id, time.time())
+            )
+            job_id = cursor.lastrowid
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO broadcast_targets (job_id, chat_id) VALUES (?, ?)",
+                ((job_id, chat_id) for chat_id in targets)
+            )
+            self.conn.execute("COMMIT")
+        return BroadcastJob(job_id, admin_chat_id, prepared, status_message_id)
+
+    def set_status_message(self, job: BroadcastJob, message_id: int):
+        """Record where the job reports its progress"""
+        job.status_message_id = message_id
+        with self.lock:
+            self.conn.execute(
+                "UPDATE broadcast_jobs SET status_message_id = ? WHERE id = ?", (message_id, job.id)
+            )
+
+    def pending_targets(self, job_id: int) -> List[int]:
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT chat_id FROM broadcast_targets WHERE job_id = ? AND state = ?", (job_id, PENDING)
+            ).fetchall()
+        return [chat_id for chat_id, in rows]
+
+    def mark(self, job_id: int, chat_id: int, state: int):
+        """Record the outcome of one target"""
+        with self.lock:
+            self.conn.execute(
+                "UPDATE broadcast_targets SET state = ? WHERE job_id = ? AND chat_id = ?",
+                (state, job_id, chat_id)
+            )
+
+    def counts(self, job_id: int) -> Tuple[int, int, int]:
+        """Return (sent, failed, pending) for a job"""
+        with self.lock:
+            rows = dict(self.conn.execute(
+                "SELECT state, COUNT(*) FROM broadcast_targets WHERE job_id = ? GROUP BY state", (job_id,)
+            ).fetchall())
+        return rows.get(SENT, 0), rows.get(FAILED, 0), rows.get(PENDING, 0)
+
+    def finish_job(self, job_id: int):
+        with self.lock:
+            self.conn.execute("UPDATE broadcast_jobs SET finished = ? WHERE id = ?", (time.time(), job_id))
+
+    def unfinished_jobs(self) -> List[BroadcastJob]:
+        """Jobs interrupted before every target was attempted, oldest first"""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT id, admin_chat_id, method, params, status_message_id "
+                "FROM broadcast_jobs WHERE finished IS NULL ORDER BY id"
+            ).fetchall()
+        return [
+            BroadcastJob(job_id, admin_chat_id, PreparedBroadcast(method, json.loads(params)), status_message_id)
+            for job_id, admin_chat_id, method, params, status_message_id in rows
+        ]
+
+    def prune(self, max_age: float = 7 * 24 * 3600):
+        """Drop finished jobs older than max_age seconds"""
+        cutoff = time.time() - max_age
+        with self.lock:
+            self.conn.execute("BEGIN")
+            self.conn.execute(
+                "DELETE FROM broadcast_targets WHERE job_id IN "
+                "(SELECT id FROM broadcast_jobs WHERE finished IS NOT NULL AND finished < ?)", (cutoff,)
+            )
+            self.conn.execute("DELETE FROM broadcast_jobs WHERE finished IS NOT NULL AND finished < ?", (cutoff,))
+            self.conn.execute("COMMIT")
+
+class BroadcastRun:
+    """One run of a broadcast job, shared by every bot: records results as they arrive and wraps up
+
+    Only sending and editing the status message differ between bots. Use it
+    as a context manager so the run stops counting towards /metrics even if
+    the sends fail; call finish() once every pending target was attempted.
+    """
+
+    def __init__(self, jobs: JobStore, job: BroadcastJob, group_manager: GroupManager):
+        self.jobs = jobs
+        self.job = job
+        self.group_manager = group_manager
+        self.targets = jobs.pending_targets(job.id)
+        sent, failed, pending = jobs.counts(job.id)
+        # A resumed job starts from the counts it had already reached
+        self.progress = BroadcastProgress(sent + failed + pending, sent, failed)
+
+    def __enter__(self) -> 'BroadcastRun':
+        bot_status.broadcasts.add(self.progress)
+        return self
+
+    def __exit__(self, *exc_info):
+        bot_status.broadcasts.discard(self.progress)
+
+    def record(self, chat_id: int, ok: bool, error=None, gone: bool = False) -> bool:
+        """Record one target's outcome, deactivating groups the bot can no longer reach
+
+        Returns True when a progress report is due. Reports are throttled, so
+        progress edits cost a handful of calls however large the audience.
+        """
+        self.jobs.mark(self.job.id, chat_id, SENT if ok else FAILED)
+        self.progress.record(ok)
+        if ok:
+            logger.debug(f"Message sent to group {chat_id}")
+        elif gone:
+            logger.warning(f"Deactivating group {chat_id}: {error}")
+            self.group_manager.deactivate_group(chat_id)
+        else:
+            logger.error(f"Failed to send to group {chat_id}: {error}")
+        return self.progress.due()
+
+    def record_result(self, chat_id: int, result: dict) -> bool:
+        """record() for a raw Bot API result"""
+        text = str(result).lower()
+        return self.record(chat_id, bool(result.get("ok")), result,
+                           "chat not found" in text or "bot was blocked" in text)
+
+    def finish(self) -> Tuple[int, int]:
+        """Close the job and save deactivations; return (sent, failed) including deliveries before any restart"""
+        self.jobs.finish_job(self.job.id)
+        logger.info(f"Broadcast job {self.job.id} finished; API metrics so far:\n{api_metrics.summary()}")
+        # Persist deactivations in one write now that the sends are done
+        self.group_manager.flush()
+        sent, failed, _ = self.jobs.counts(self.job.id)
+        return sent, failed
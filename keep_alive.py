@@ -1,16 +1,63 @@
 # keep_alive.py
-from flask import Flask
+import hmac
+import logging
+from flask import Flask, Response, request
 from threading import Thread
+from config import PORT, WEBHOOK_PATH
+from metrics import bot_status, render_prometheus
+
+logger = logging.getLogger(__name__)
 
 app = Flask('')
 
+# Set by the bot when it runs in webhook mode
+webhook = {"handler": None, "secret": None}
+
 @app.route('/')
 def home():
     return "I'm alive!"
 
+@app.route('/metrics')
+def metrics():
+    """Prometheus scrape endpoint; reads in-memory counters only, never the bot's I/O paths"""
+    return Response(render_prometheus(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/healthz')
+def healthz():
+    """Fail once the update loop has stopped getting through to Telegram"""
+    if not bot_status.healthy():
+        return bot_status.failure or "Polling stalled", 503
+    return "OK"
+
+@app.route(WEBHOOK_PATH, methods=['POST'])
+def receive_update():
+    """Accept an update pushed by Telegram and hand it to the bot"""
+    handler, secret = webhook["handler"], webhook["secret"]
+    if handler is None:
+        return "Webhook not enabled", 503
+    
+    token = request.headers.get('X-Telegram-Bot-Api-Secret-Token', '')
+    if not secret or not hmac.compare_digest(token, secret):
+        logger.warning("Rejected webhook request with invalid secret token")
+        return "Forbidden", 403
+    
+    update = request.get_json(silent=True)
+    if not isinstance(update, dict) or "update_id" not in update:
+        return "Bad Request", 400
+    
+    # The handler must only enqueue; Telegram retries slow webhook responses
+    handler(update)
+    return "OK"
+
+def set_update_handler(handler, secret: str):
+    """Route webhook updates to handler, accepting only requests carrying secret"""
+    webhook["secret"] = secret
+    webhook["handler"] = handler
+
 def run():
-    app.run(host='0.0.0.0', port=8080)
+    app.run(host='0.0.0.0', port=PORT)
 
 def keep_alive():
-    t = Thread(target=run)
+    # Daemon, so the process exits (and gets restarted) when the bot itself stops
+    t = Thread(target=run, daemon=True)
     t.start()
@@ -0,0 +1,398 @@
+import bisect
+import logging
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from config import HEALTH_STALL_AFTER
+from rate_limit import UNTHROTTLED_METHODS
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (seconds) of the latency buckets; getUpdates long polls land in the top ones
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+# Upper bounds (seconds) of the buckets for time a broadcast waits in its lane
+QUEUE_BUCKETS = (0.1, 1, 5, 15, 30, 60, 120, 300, 600, 1800, 3600)
+
+class Histogram:
+    """Fixed-bucket histogram; quantiles are interpolated within a bucket, like Prometheus"""
+
+    __slots__ = ('bounds', 'counts', 'count', 'sum')
+
+    def __init__(self, bounds=LATENCY_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # last bucket is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            if seen + count >= rank and count:
+                if i == len(self.bounds):
+                    # Past the last bound there is nothing to interpolate towards
+                    return self.bounds[-1]
+                lower = self.bounds[i - 1] if i else 0.0
+                return lower + (self.bounds[i] - lower) * (rank - seen) / count
+            seen += count
+        return self.bounds[-1]
+
+class RateWindow:
+    """Events per second over a sliding window of one-second slots"""
+
+    __slots__ = ('seconds', 'counts', 'stamps')
+
+    def __init__(self, seconds: int = 60):
+        self.seconds = seconds
+        self.counts = [0] * seconds
+        self.stamps = [0] * seconds
+
+    def add(self, now: float, count: int = 1):
+        second = int(now)
+        slot = second % self.seconds
+        if self.stamps[slot] != second:
+            self.stamps[slot] = second
+            self.counts[slot] = 0
+        self.counts[slot] += count
+
+    def rate(self, now: float) -> float:
+        second = int(now)
+        total = sum(count for count, stamp in zip(self.counts, self.stamps) if second - stamp < self.seconds)
+        return total / self.seconds
+
+class MethodStats:
+    """Counters and latency for one Bot API method"""
+
+    __slots__ = ('calls', 'errors', 'flood_limited', 'throttled', 'latency')
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.flood_limited = 0
+        self.throttled = 0.0  # seconds spent waiting on the local rate limiter
+        self.latency = Histogram()
+
+class ApiMetrics:
+    """Per-method call counts, errors, 429s and latency histograms for Bot API calls
+
+    Every HTTP attempt is recorded, retries included, so latency reflects
+    what Telegram (or the network) actually took; time spent queued behind
+    the local rate limiter is tracked separately.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.methods: Dict[str, MethodStats] = {}
+        self.sends = RateWindow()
+        self.floods = RateWindow()
+
+    def stats(self, method: str) -> MethodStats:
+        """Return the stats for a method (call with lock held)"""
+        stats = self.methods.get(method)
+        if stats is None:
+            stats = self.methods[method] = MethodStats()
+        return stats
+
+    def record(self, method: str, seconds: float, ok: bool, flood_limited: bool = False):
+        """Record one completed (or failed) HTTP attempt"""
+        with self.lock:
+            stats = self.stats(method)
+            stats.calls += 1
+            stats.latency.observe(seconds)
+            if not ok:
+                stats.errors += 1
+            if flood_limited:
+                stats.flood_limited += 1
+            if method not in UNTHROTTLED_METHODS:
+                now = time.monotonic()
+                self.sends.add(now)
+                if flood_limited:
+                    self.floods.add(now)
+
+    def record_wait(self, method: str, seconds: float):
+        """Record time a call spent waiting for a send slot"""
+        if seconds > 0:
+            with self.lock:
+                self.stats(method).throttled += seconds
+
+    def drain(self) -> Dict[str, tuple]:
+        """Hand over and reset the raw per-method figures (see merge)"""
+        with self.lock:
+            methods, self.methods = self.methods, {}
+        return {
+            method: (stats.calls, stats.errors, stats.flood_limited, stats.throttled,
+                     stats.latency.counts, stats.latency.sum)
+            for method, stats in methods.items()
+        }
+
+    def merge(self, drained: Dict[str, tuple]):
+        """Add figures drained from another process's ApiMetrics"""
+        now = time.monotonic()
+        with self.lock:
+            for method, (calls, errors, flood_limited, throttled, counts, latency_sum) in drained.items():
+                stats = self.stats(method)
+                stats.calls += calls
+                stats.errors += errors
+                stats.flood_limited += flood_limited
+                stats.throttled += throttled
+                stats.latency.count += calls
+                stats.latency.sum += latency_sum
+                stats.latency.counts = [a + b for a, b in zip(stats.latency.counts, counts)]
+                if method not in UNTHROTTLED_METHODS:
+                    self.sends.add(now, calls)
+                    self.floods.add(now, flood_limited)
+
+    def rates(self):
+        """(sends per second, 429s per second) over the last minute"""
+        now = time.monotonic()
+        with self.lock:
+            return self.sends.rate(now), self.floods.rate(now)
+
+    def snapshot(self) -> Dict[str, dict]:
+        """Current figures per method, with p50/p95/p99 latency in seconds"""
+        with self.lock:
+            return {
+                method: {
+                    "calls": stats.calls,
+                    "errors": stats.errors,
+                    "flood_limited": stats.flood_limited,
+                    "throttled": stats.throttled,
+                    "latency_sum": stats.latency.sum,
+                    "buckets": list(stats.latency.counts),
+                    "p50": stats.latency.quantile(0.5),
+                    "p95": stats.latency.quantile(0.95),
+                    "p99": stats.latency.quantile(0.99)
+                }
+                for method, stats in self.methods.items()
+            }
+
+    def summary(self, method: Optional[str] = None) -> str:
+        """One line per method, for the logs"""
+        lines = []
+        for name, figures in sorted(self.snapshot().items()):
+            if method and name != method:
+                continue
+            lines.append(
+                f"{name}: {figures['calls']} calls, {figures['errors']} errors, "
+                f"{figures['flood_limited']} flood-limited, throttled {figures['throttled']:.1f}s, "
+                f"p50 {figures['p50'] * 1000:.0f}ms p95 {figures['p95'] * 1000:.0f}ms "
+                f"p99 {figures['p99'] * 1000:.0f}ms"
+            )
+        return "\n".join(lines)
+
+class LaneStats:
+    """Queue and send figures for one broadcast priority lane"""
+
+    __slots__ = ('queued', 'jobs', 'sends', 'preempted', 'queue_time', 'rate')
+
+    def __init__(self):
+        self.queued = 0  # jobs waiting or running
+        self.jobs = 0  # jobs started
+        self.sends = 0
+        self.preempted = 0.0  # seconds held back for a higher-priority lane
+        self.queue_time = Histogram(QUEUE_BUCKETS)
+        self.rate = RateWindow()
+
+class LaneMetrics:
+    """Per-lane depth, queue time, throughput and preemption of the broadcast queue"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.lanes: Dict[str, LaneStats] = {}
+
+    def stats(self, lane: str) -> LaneStats:
+        """Return the stats for a lane (call with lock held)"""
+        stats = self.lanes.get(lane)
+        if stats is None:
+            stats = self.lanes[lane] = LaneStats()
+        return stats
+
+    def queued(self, lane: str, delta: int = 1):
+        with self.lock:
+            self.stats(lane).queued += delta
+
+    def started(self, lane: str, waited: float):
+        """Record a job leaving the queue after waiting the given time"""
+        with self.lock:
+            stats = self.stats(lane)
+            stats.jobs += 1
+            stats.queue_time.observe(waited)
+
+    def sent(self, lane: str, count: int = 1):
+        with self.lock:
+            stats = self.stats(lane)
+            stats.sends += count
+            stats.rate.add(time.monotonic(), count)
+
+    def preempted(self, lane: str, seconds: float):
+        with self.lock:
+            self.stats(lane).preempted += seconds
+
+    def snapshot(self) -> Dict[str, dict]:
+        now = time.monotonic()
+        with self.lock:
+            return {
+                lane: {
+                    "queued": stats.queued,
+                    "jobs": stats.jobs,
+                    "sends": stats.sends,
+                    "preempted": stats.preempted,
+                    "sends_per_second": stats.rate.rate(now),
+                    "queue_time_sum": stats.queue_time.sum,
+                    "buckets": list(stats.queue_time.counts),
+                    "queue_p50": stats.queue_time.quantile(0.5),
+                    "queue_p95": stats.queue_time.quantile(0.95)
+                }
+                for lane, stats in self.lanes.items()
+            }
+
+    def summary(self) -> str:
+        """One line per lane, for the logs"""
+        return "\n".join(
+            f"{lane}: {figures['queued']} queued, {figures['jobs']} jobs, {figures['sends']} sends "
+            f"({figures['sends_per_second']:.1f}/s), preempted {figures['preempted']:.1f}s, "
+            f"queue p50 {figures['queue_p50']:.1f}s p95 {figures['queue_p95']:.1f}s"
+            for lane, figures in sorted(self.snapshot().items())
+        )
+
+class BotStatus:
+    """Liveness of the update loop plus gauges registered by the running bot"""
+
+    def __init__(self, stall_after: float = HEALTH_STALL_AFTER):
+        self.stall_after = stall_after
+        self.started = time.time()
+        self.last_poll: Optional[float] = None
+        self.webhook = False  # updates are pushed, so there is no poll to watch
+        self.failure: Optional[str] = None
+        self.update_lag: Optional[float] = None
+        self.broadcasts = set()  # BroadcastProgress of every running broadcast
+        self.gauges: Dict[str, tuple] = {}
+
+    def polled(self):
+        """Record a successful getUpdates"""
+        self.last_poll = time.time()
+
+    def serving_webhook(self):
+        """Record that Telegram now pushes updates to the webhook"""
+        self.webhook = True
+
+    def failed(self, reason: str):
+        """Mark the bot unhealthy for good, e.g. when it could not start"""
+        self.failure = reason
+
+    def received(self, updates: List[dict]):
+        """Record how far behind the newest message in a batch is"""
+        dates = [update["message"]["date"] for update in updates if "date" in update.get("message", {})]
+        if dates:
+            self.update_lag = max(0.0, time.time() - max(dates))
+
+    def register_gauge(self, name: str, help_text: str, read: Callable[[], float]):
+        """Export read() as a gauge on /metrics"""
+        self.gauges[name] = (help_text, read)
+
+    def pending_broadcast_targets(self) -> int:
+        return sum(progress.remaining for progress in list(self.broadcasts))
+
+    def healthy(self) -> bool:
+        """False once the bot failed, or has gone stall_after seconds without a successful getUpdates
+
+        Before the first poll the clock runs from startup, so a bot that
+        never gets through to Telegram (bad token, first poll hanging) turns
+        unhealthy too.
+        """
+        if self.failure:
+            return False
+        if self.webhook:
+            return True
+        return time.time() - (self.last_poll or self.started) < self.stall_after
+
+def _labels(**labels) -> str:
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels.items()) + "}"
+
+def render_prometheus() -> str:
+    """Render every metric in the Prometheus text exposition format"""
+    snapshot = api_metrics.snapshot()
+    lanes = sorted(lane_metrics.snapshot().items())
+    sends_per_second, floods_per_second = api_metrics.rates()
+    lines = []
+
+    def metric(name: str, kind: str, help_text: str, samples):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, value in samples:
+            lines.append(f"{name}{labels} {value}")
+
+    by_method = sorted(snapshot.items())
+    metric("drct_api_requests_total", "counter", "Bot API HTTP requests, retries included",
+           [(_labels(method=m), f["calls"]) for m, f in by_method])
+    metric("drct_api_errors_total", "counter", "Bot API requests that did not return ok",
+           [(_labels(method=m), f["errors"]) for m, f in by_method])
+    metric("drct_api_flood_limited_total", "counter", "Bot API requests rejected with 429",
+           [(_labels(method=m), f["flood_limited"]) for m, f in by_method])
+    metric("drct_api_throttled_seconds_total", "counter", "Time spent waiting on the local rate limiter",
+           [(_labels(method=m), f"{f['throttled']:.3f}") for m, f in by_method])
+
+    def histogram(name: str, help_text: str, bounds: tuple, label: str, series):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} histogram")
+        for value, buckets, total, count in series:
+            cumulative = 0
+            for bound, bucket in zip(bounds + ("+Inf",), buckets):
+                cumulative += bucket
+                lines.append(f"{name}_bucket{_labels(**{label: value, 'le': bound})} {cumulative}")
+            lines.append(f"{name}_sum{_labels(**{label: value})} {total:.6f}")
+            lines.append(f"{name}_count{_labels(**{label: value})} {count}")
+
+    histogram("drct_api_request_duration_seconds", "Bot API request latency", LATENCY_BUCKETS, "method",
+              [(m, f["buckets"], f["latency_sum"], f["calls"]) for m, f in by_method])
+    metric("drct_api_request_latency_seconds", "summary", "Bot API request latency quantiles", [
+        (_labels(method=m, quantile=q), f"{f[key]:.6f}")
+        for m, f in by_method for q, key in (("0.5", "p50"), ("0.95", "p95"), ("0.99", "p99"))
+    ])
+
+    metric("drct_sends_per_second", "gauge", "Message sends per second over the last minute",
+           [("", f"{sends_per_second:.3f}")])
+    metric("drct_flood_limited_per_second", "gauge", "429 responses per second over the last minute",
+           [("", f"{floods_per_second:.3f}")])
+    if bot_status.last_poll is not None:
+        metric("drct_last_get_updates_timestamp_seconds", "gauge", "Unix time of the last successful getUpdates",
+               [("", f"{bot_status.last_poll:.3f}")])
+    if bot_status.update_lag is not None:
+        metric("drct_update_lag_seconds", "gauge", "Delay between a message being sent and the bot receiving it",
+               [("", f"{bot_status.update_lag:.3f}")])
+    metric("drct_broadcast_pending_targets", "gauge", "Targets still to be sent by running broadcasts",
+           [("", bot_status.pending_broadcast_targets())])
+
+    metric("drct_broadcast_lane_jobs_queued", "gauge", "Broadcast jobs waiting or running in each priority lane",
+           [(_labels(lane=l), f["queued"]) for l, f in lanes])
+    metric("drct_broadcast_lane_jobs_total", "counter", "Broadcast jobs started in each priority lane",
+           [(_labels(lane=l), f["jobs"]) for l, f in lanes])
+    metric("drct_broadcast_lane_sends_total", "counter", "Broadcast sends completed in each priority lane",
+           [(_labels(lane=l), f["sends"]) for l, f in lanes])
+    metric("drct_broadcast_lane_sends_per_second", "gauge", "Broadcast sends per second over the last minute",
+           [(_labels(lane=l), f"{f['sends_per_second']:.3f}") for l, f in lanes])
+    metric("drct_broadcast_lane_preempted_seconds_total", "counter",
+           "Time broadcasts were held back for a higher-priority lane",
+           [(_labels(lane=l), f"{f['preempted']:.3f}") for l, f in lanes])
+    histogram("drct_broadcast_lane_queue_seconds", "Time broadcast jobs waited before starting", QUEUE_BUCKETS,
+              "lane", [(l, f["buckets"], f["queue_time_sum"], f["jobs"]) for l, f in lanes])
+    for name, (help_text, read) in sorted(bot_status.gauges.items()):
+        try:
+            metric(name, "gauge", help_text, [("", read())])
+        except Exception as e:
+            logger.warning(f"Could not read gauge {name}: {e}")
+
+    return "\n".join(lines) + "\n"
+
+# Shared by the raw Bot API client and the python-telegram-bot application
+api_metrics = ApiMetrics()
+lane_metrics = LaneMetrics()
+bot_status = BotStatus()
@@ -199,9 +199,10 @@ class NewsBot:
         """Handle bot being added to or removed from groups"""
         chat = update.effective_chat
         
+        bot_user = context.bot_data["bot_user"]
+        
         # Check if bot was added to group
         if update.message and update.message.new_chat_members:
-            bot_user = await context.bot.get_me()
             for member in update.message.new_chat_members:
                 if member.id == bot_user.id:
                     # Bot was added to group
@@ -229,7 +230,6 @@ class NewsBot:
         
         # Check if bot was removed from group
         if update.message and update.message.left_chat_member:
-            bot_user = await context.bot.get_me()
             if update.message.left_chat_member.id == bot_user.id:
                 # Bot was removed from group
                 self.group_manager.remove_group(chat.id)
@@ -321,7 +321,9 @@ class NewsBot:
     
     async def post_init(self, application):
         """Post initialization setup"""
-        bot_info = await application.bot.get_me()
+        # initialize() already called getMe; cache that identity for every handler
+        bot_info = application.bot.bot
+        application.bot_data["bot_user"] = bot_info
         logger.info(f"Bot started: @{bot_info.username} ({bot_info.first_name})")
         logger.info(f"Admin ID: {ADMIN_ID}")
         
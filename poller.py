@@ -0,0 +1,92 @@
+import logging
+import random
+import time
+from typing import Callable, List, Sequence
+
+from config import POLL_TIMEOUT, POLL_LIMIT, POLL_BACKOFF_MAX
+from metrics import bot_status
+
+logger = logging.getLogger(__name__)
+
+# Extra time on top of the long-poll timeout before the HTTP read gives up
+HTTP_TIMEOUT_MARGIN = 10
+
+class Backoff:
+    """Exponential backoff with full jitter"""
+
+    def __init__(self, base: float = 1.0, maximum: float = POLL_BACKOFF_MAX):
+        self.base = base
+        self.maximum = maximum
+        self.failures = 0
+
+    def reset(self):
+        self.failures = 0
+
+    def next_delay(self) -> float:
+        """Record a failure and return how long to wait before retrying"""
+        self.failures += 1
+        ceiling = min(self.maximum, self.base * 2 ** (self.failures - 1))
+        return random.uniform(ceiling / 2, ceiling)
+
+class UpdatePoller:
+    """Long-polls getUpdates, tracking the offset and backing off on errors
+
+    The HTTP timeout always outlasts the long-poll timeout, so an idle poll
+    ends with an empty result from Telegram rather than a client-side read
+    timeout and reconnect. The poller only builds requests and interprets
+    responses; the caller does the I/O, so it serves both the threaded and
+    the asyncio bot.
+    """
+
+    def __init__(
+        self,
+        offset: int = 0,
+        timeout: int = POLL_TIMEOUT,
+        limit: int = POLL_LIMIT,
+        allowed_updates: Sequence[str] = ("message",)
+    ):
+        self.offset = offset
+        self.timeout = timeout
+        self.limit = limit
+        self.allowed_updates = list(allowed_updates)
+        self.backoff = Backoff()
+        self.delay = 0.0
+
+    @property
+    def http_timeout(self) -> float:
+        return self.timeout + HTTP_TIMEOUT_MARGIN
+
+    def request_params(self) -> dict:
+        """Parameters for the next getUpdates call"""
+        params = {
+            "timeout": self.timeout,
+            "limit": self.limit,
+            "allowed_updates": self.allowed_updates
+        }
+        if self.offset:
+            params["offset"] = self.offset
+        return params
+
+    def handle_response(self, response: dict) -> List[dict]:
+        """Return the new updates and set self.delay to the wait before the next poll"""
+        if not response.get("ok"):
+            self.delay = self.backoff.next_delay()
+            logger.error(f"Failed to get updates: {response} (retrying in {self.delay:.1f}s)")
+            return []
+
+        self.backoff.reset()
+        self.delay = 0.0
+        bot_status.polled()
+        updates = response.get("result", [])
+        if updates:
+            self.offset = updates[-1]["update_id"] + 1
+            bot_status.received(updates)
+        return updates
+
+    def poll(self, request: Callable[..., dict]) -> List[dict]:
+        """Fetch the next batch of updates using a blocking request function"""
+        response = request("getUpdates", self.request_params(), timeout=self.http_timeout)
+        updates = self.handle_response(response)
+        if self.delay:
+            time.sleep(self.delay)
+        return updates
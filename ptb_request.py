@@ -0,0 +1,68 @@
+import logging
+import time
+from datetime import timedelta
+from typing import Any, Callable, Coroutine, Dict, List, Optional, Tuple, Union
+
+from telegram.error import RetryAfter
+from telegram.ext import BaseRateLimiter
+from telegram.request import HTTPXRequest
+
+from config import FLOOD_MAX_RETRIES
+from metrics import api_metrics, bot_status
+from rate_limit import rate_limiter, UNTHROTTLED_METHODS
+
+logger = logging.getLogger(__name__)
+
+class SharedRateLimiter(BaseRateLimiter[None]):
+    """Route python-telegram-bot requests through the shared send budget"""
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
+
+    async def process_request(
+        self,
+        callback: Callable[..., Coroutine[Any, Any, Union[bool, Dict, List[Dict]]]],
+        args: Any,
+        kwargs: Dict[str, Any],
+        endpoint: str,
+        data: Dict[str, Any],
+        rate_limit_args: Optional[None],
+    ) -> Union[bool, Dict, List[Dict]]:
+        """Wait for a send slot, then perform the request, retrying on flood control"""
+        for attempt in range(FLOOD_MAX_RETRIES + 1):
+            if endpoint not in UNTHROTTLED_METHODS:
+                api_metrics.record_wait(endpoint, await rate_limiter.wait_async(data.get("chat_id")))
+            try:
+                return await callback(*args, **kwargs)
+            except RetryAfter as e:
+                if attempt == FLOOD_MAX_RETRIES:
+                    raise
+                retry_after = e.retry_after
+                if isinstance(retry_after, timedelta):
+                    retry_after = retry_after.total_seconds()
+                rate_limiter.pause(retry_after)
+                logger.warning(
+                    f"Flood limit hit on {endpoint}, pausing sends for {retry_after}s "
+                    f"(attempt {attempt + 1}/{FLOOD_MAX_RETRIES + 1})"
+                )
+
+class InstrumentedRequest(HTTPXRequest):
+    """HTTPXRequest that records every Bot API call in the shared metrics"""
+
+    async def do_request(self, url: str, method: str, *args, **kwargs) -> Tuple[int, bytes]:
+        endpoint = url.rsplit("/", 1)[-1]
+        started = time.monotonic()
+        try:
+            status_code, payload = await super().do_request(url, method, *args, **kwargs)
+        except Exception:
+            api_metrics.record(endpoint, time.monotonic() - started, ok=False)
+            raise
+        api_metrics.record(
+            endpoint, time.monotonic() - started, ok=status_code == 200, flood_limited=status_code == 429
+        )
+        if endpoint == "getUpdates" and status_code == 200:
+            bot_status.polled()
+        return status_code, payload
@@ -0,0 +1,163 @@
+import asyncio
+import logging
+import multiprocessing
+import threading
+import time
+from typing import Dict, Optional
+
+from config import RATE_LIMIT_GLOBAL, RATE_LIMIT_PER_CHAT, RATE_LIMIT_PER_GROUP, RATE_LIMIT_BURST
+
+logger = logging.getLogger(__name__)
+
+# Methods that don't count against Telegram's message limits
+UNTHROTTLED_METHODS = {
+    "getMe", "getUpdates", "setWebhook", "deleteWebhook", "getWebhookInfo",
+    "getChat", "getChatMember", "getFile",
+}
+
+def is_flood_limited(result: dict) -> bool:
+    """Check whether an API result is a 429 Too Many Requests response"""
+    return result.get("error_code") == 429
+
+class TokenBucket:
+    """Token bucket where callers reserve a token and get back how long to wait
+
+    Tokens may go negative: each reservation past the budget is queued
+    behind the previous ones, so concurrent callers are spread out evenly
+    instead of all waking up at the same moment.
+    """
+
+    __slots__ = ('rate', 'capacity', 'tokens', 'updated')
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now: float):
+        """Add the tokens earned since the last update"""
+        if now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def reserve(self, now: float, cost: float = 1) -> float:
+        """Take tokens and return the delay before they may be spent"""
+        self.refill(now)
+        self.tokens -= cost
+        if self.tokens >= 0:
+            return 0.0
+        return -self.tokens / self.rate
+
+class SharedBudget:
+    """Global token bucket and flood pause kept in shared memory
+
+    Same reservation scheme as TokenBucket, but every process holding the
+    budget draws from the same tokens, and a 429 seen by any of them pauses
+    them all. Create it before starting worker processes and pass it to them.
+    """
+
+    def __init__(self, rate: float = RATE_LIMIT_GLOBAL, capacity: float = None, context=multiprocessing):
+        self.rate = rate
+        self.capacity = max(rate, 1) if capacity is None else capacity
+        self.lock = context.Lock()
+        # tokens, last refill (monotonic, which is system-wide), paused until
+        self.state = context.RawArray('d', [self.capacity, time.monotonic(), 0.0])
+
+    def reserve(self, now: float, cost: float = 1) -> float:
+        """Take tokens and return the delay before they may be spent"""
+        with self.lock:
+            state = self.state
+            if now > state[1]:
+                state[0] = min(self.capacity, state[0] + (now - state[1]) * self.rate)
+                state[1] = now
+            state[0] -= cost
+            tokens, paused_until = state[0], state[2]
+        delay = 0.0 if tokens >= 0 else -tokens / self.rate
+        return max(delay, paused_until - now)
+
+    def pause(self, seconds: float):
+        with self.lock:
+            self.state[2] = max(self.state[2], time.monotonic() + seconds)
+
+class RateLimiter:
+    """Global plus per-chat send budget shared by every outbound API call"""
+
+    PRUNE_THRESHOLD = 5000
+    PRUNE_INTERVAL = 60
+
+    def __init__(
+        self,
+        global_rate: float = RATE_LIMIT_GLOBAL,
+        chat_rate: float = RATE_LIMIT_PER_CHAT,
+        group_rate_per_minute: float = RATE_LIMIT_PER_GROUP,
+        burst: int = RATE_LIMIT_BURST
+    ):
+        self.lock = threading.Lock()
+        self.global_bucket = TokenBucket(global_rate, max(global_rate, 1))
+        self.chat_rate = chat_rate
+        self.group_rate = group_rate_per_minute / 60
+        self.burst = burst
+        self.chat_buckets: Dict[int, TokenBucket] = {}
+        self.last_prune = time.monotonic()
+        self.paused_until = 0.0
+        self.shared: Optional[SharedBudget] = None
+
+    def use_shared_budget(self, budget: SharedBudget):
+        """Take the global limit and flood pauses from a budget shared with other processes"""
+        self.shared = budget
+
+    def _chat_bucket(self, chat_id: int) -> TokenBucket:
+        bucket = self.chat_buckets.get(chat_id)
+        if bucket is None:
+            # Negative IDs are groups, supergroups and channels
+            rate = self.group_rate if chat_id < 0 else self.chat_rate
+            bucket = self.chat_buckets[chat_id] = TokenBucket(rate, self.burst)
+        return bucket
+
+    def _prune(self, now: float):
+        """Forget per-chat buckets that have fully refilled"""
+        self.last_prune = now
+        for chat_id, bucket in list(self.chat_buckets.items()):
+            bucket.refill(now)
+            if bucket.tokens >= bucket.capacity:
+                del self.chat_buckets[chat_id]
+
+    def reserve(self, chat_id: Optional[int] = None, cost: int = 1) -> float:
+        """Reserve a send slot and return the number of seconds to wait for it"""
+        now = time.monotonic()
+        with self.lock:
+            if self.shared is not None:
+                delay = self.shared.reserve(now, cost)
+            else:
+                delay = max(self.global_bucket.reserve(now, cost), self.paused_until - now)
+            if isinstance(chat_id, int):
+                delay = max(delay, self._chat_bucket(chat_id).reserve(now, cost))
+                if len(self.chat_buckets) > self.PRUNE_THRESHOLD and now - self.last_prune > self.PRUNE_INTERVAL:
+                    self._prune(now)
+        return delay
+
+    def pause(self, seconds: float):
+        """Hold back every send for the given time (Telegram flood control)"""
+        if self.shared is not None:
+            self.shared.pause(seconds)
+            return
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def wait(self, chat_id: Optional[int] = None, cost: int = 1) -> float:
+        """Block the calling thread until a send slot is available; return the time waited"""
+        delay = self.reserve(chat_id, cost)
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+    async def wait_async(self, chat_id: Optional[int] = None, cost: int = 1) -> float:
+        """Suspend the calling coroutine until a send slot is available; return the time waited"""
+        delay = self.reserve(chat_id, cost)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return delay
+
+# Shared by the raw Bot API client and the python-telegram-bot application
+rate_limiter = RateLimiter()
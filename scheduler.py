@@ -0,0 +1,233 @@
+import heapq
+import json
+import logging
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from config import DB_FILE, SCHEDULE_MIN_GAP, SCHEDULE_TIMEZONE
+from broadcast import PreparedBroadcast
+
+logger = logging.getLogger(__name__)
+
+UNIT_SECONDS = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 7 * 86400}
+REPEAT_WORDS = {"hourly": 3600, "daily": 86400, "weekly": 7 * 86400}
+
+def parse_duration(text: str) -> Optional[float]:
+    """Seconds in a duration like 90s, 30m, 2h, 1d or 1h30m; None if it isn't one"""
+    text = text.lower()
+    if not re.fullmatch(r"(?:\d+[smhdw])+", text):
+        return None
+    return sum(int(amount) * UNIT_SECONDS[unit] for amount, unit in re.findall(r"(\d+)([smhdw])", text))
+
+def parse_schedule(args: List[str], now: float = None,
+                   timezone: str = SCHEDULE_TIMEZONE) -> Tuple[float, Optional[float]]:
+    """Turn /schedule arguments into (due unix time, repeat interval in seconds or None)
+
+    The time is a delay (30m, 2h), a clock time (18:30, the next one to
+    come) or a date and time (2026-01-26 09:00), in SCHEDULE_TIMEZONE. It
+    may be followed by hourly, daily, weekly or "every <duration>", or
+    be left out of a repeating schedule to start one interval from now.
+    Raises ValueError for anything else.
+    """
+    now = time.time() if now is None else now
+    tz = ZoneInfo(timezone)
+    words = [word.lower() for word in args]
+
+    interval = None
+    if len(words) >= 2 and words[-2] == "every":
+        interval = parse_duration(words[-1])
+        if not interval:
+            raise ValueError(f"Unknown interval: {words[-1]}")
+        words = words[:-2]
+    elif words and words[-1] in REPEAT_WORDS:
+        interval = REPEAT_WORDS[words.pop()]
+    if interval is not None and interval < 60:
+        raise ValueError("Repeat interval must be at least a minute")
+
+    if not words and interval:
+        # "every 6h" on its own starts one interval from now
+        return now + interval, interval
+
+    when = " ".join(words)
+    delay = parse_duration(when) if len(words) == 1 else None
+    if delay:
+        return now + delay, interval
+
+    local_now = datetime.fromtimestamp(now, tz)
+    for fmt in ("%Y-%m-%d %H:%M", "%d-%m-%Y %H:%M"):
+        try:
+            due = datetime.strptime(when, fmt).replace(tzinfo=tz)
+            break
+        except ValueError:
+            continue
+    else:
+        try:
+            clock = datetime.strptime(when, "%H:%M")
+        except ValueError:
+            raise ValueError(f"Unknown time: {when or '(none)'}")
+        due = local_now.replace(hour=clock.hour, minute=clock.minute, second=0, microsecond=0)
+        if due <= local_now:
+            due += timedelta(days=1)
+
+    if due.timestamp() <= now:
+        raise ValueError("That time has already passed")
+    return due.timestamp(), interval
+
+def format_interval(seconds: float) -> str:
+    """Largest whole unit of a repeat interval, e.g. 6h or 1d"""
+    for unit in "wdhm":
+        if seconds % UNIT_SECONDS[unit] == 0:
+            return f"{int(seconds // UNIT_SECONDS[unit])}{unit}"
+    return f"{int(seconds)}s"
+
+def format_time(timestamp: float, timezone: str = SCHEDULE_TIMEZONE) -> str:
+    return datetime.fromtimestamp(timestamp, ZoneInfo(timezone)).strftime("%d %b %H:%M")
+
+class ScheduledBroadcast:
+    """A broadcast waiting for its time; recurring ones have an interval"""
+
+    __slots__ = ('id', 'admin_chat_id', 'prepared', 'due', 'interval')
+
+    def __init__(self, id: int, admin_chat_id: int, prepared: PreparedBroadcast, due: float,
+                 interval: Optional[float] = None):
+        self.id = id
+        self.admin_chat_id = admin_chat_id
+        self.prepared = prepared
+        self.due = due
+        self.interval = interval
+
+class BroadcastScheduler:
+    """Persistent timer for scheduled and recurring broadcasts
+
+    Entries live in SQLite and in a heap ordered by due time, so the timer
+    thread only ever looks at the earliest one and sleeps until it is due
+    or a new entry arrives. Cancelled entries are dropped from the index and
+    skipped when they reach the top of the heap.
+
+    Due broadcasts are handed over one at a time, at least min_gap seconds
+    apart, and each priority lane runs one job at a time, so drops
+    scheduled for the same moment go out one after another instead of
+    competing for the same send budget. An entry is advanced (or removed)
+    before it is handed over, so a crash mid-fire never sends it twice;
+    recurring entries that were missed while the bot was down fire once
+    and then continue from the next future slot.
+    """
+
+    def __init__(self, fire: Callable[[ScheduledBroadcast], None], path: str = DB_FILE,
+                 min_gap: float = SCHEDULE_MIN_GAP):
+        self.fire = fire
+        self.min_gap = min_gap
+        self.lock = threading.Lock()
+        self.wakeup = threading.Condition(self.lock)
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS scheduled_broadcasts ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " admin_chat_id INTEGER NOT NULL,"
+            " method TEXT NOT NULL,"
+            " params TEXT NOT NULL,"
+            " due REAL NOT NULL,"
+            " interval REAL)"
+        )
+        self.entries: Dict[int, ScheduledBroadcast] = {}
+        self.heap: List[Tuple[float, int]] = []
+        self.thread = None
+        self.load()
+
+    def load(self):
+        rows = self.conn.execute(
+            "SELECT id, admin_chat_id, method, params, due, interval FROM scheduled_broadcasts"
+        ).fetchall()
+        with self.lock:
+            for entry_id, admin_chat_id, method, params, due, interval in rows:
+                prepared = PreparedBroadcast(method, json.loads(params))
+                self.entries[entry_id] = ScheduledBroadcast(entry_id, admin_chat_id, prepared, due, interval)
+                self.heap.append((due, entry_id))
+            heapq.heapify(self.heap)
+        if rows:
+            logger.info(f"Loaded {len(rows)} scheduled broadcasts")
+
+    def add(self, admin_chat_id: int, prepared: PreparedBroadcast, due: float,
+            interval: Optional[float] = None) -> ScheduledBroadcast:
+        """Persist a broadcast to be sent at due (and every interval seconds after, if given)"""
+        with self.wakeup:
+            cursor = self.conn.execute(
+                "INSERT INTO scheduled_broadcasts (admin_chat_id, method, params, due, interval) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (admin_chat_id, prepared.method, json.dumps(prepared.params), due, interval)
+            )
+            entry = ScheduledBroadcast(cursor.lastrowid, admin_chat_id, prepared, due, interval)
+            self.entries[entry.id] = entry
+            heapq.heappush(self.heap, (due, entry.id))
+            self.wakeup.notify()
+        logger.info(f"Scheduled broadcast {entry.id} for {format_time(due)}")
+        return entry
+
+    def cancel(self, entry_id: int) -> bool:
+        """Remove a scheduled broadcast; False if there is no such entry"""
+        with self.lock:
+            if self.entries.pop(entry_id, None) is None:
+                return False
+            self.conn.execute("DELETE FROM scheduled_broadcasts WHERE id = ?", (entry_id,))
+        logger.info(f"Cancelled scheduled broadcast {entry_id}")
+        return True
+
+    def upcoming(self) -> List[ScheduledBroadcast]:
+        """Every scheduled broadcast, soonest first"""
+        with self.lock:
+            return sorted(self.entries.values(), key=lambda entry: entry.due)
+
+    def pending(self) -> int:
+        return len(self.entries)
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.run, name="scheduler", daemon=True)
+            self.thread.start()
+
+    def next_due(self) -> Optional[ScheduledBroadcast]:
+        """Wait until the earliest entry is due and take it off the timer (call with lock held)"""
+        while True:
+            while self.heap and (self.heap[0][1] not in self.entries or
+                                 self.entries[self.heap[0][1]].due != self.heap[0][0]):
+                heapq.heappop(self.heap)  # cancelled, or superseded by a later due time
+            if not self.heap:
+                self.wakeup.wait()
+                continue
+            delay = self.heap[0][0] - time.time()
+            if delay > 0:
+                self.wakeup.wait(delay)
+                continue
+            _, entry_id = heapq.heappop(self.heap)
+            entry = self.entries[entry_id]
+            if entry.interval:
+                fired = ScheduledBroadcast(entry.id, entry.admin_chat_id, entry.prepared, entry.due, entry.interval)
+                # Skip slots missed while the bot was down rather than firing them all at once
+                now = time.time()
+                missed = max(0, int((now - entry.due) // entry.interval))
+                entry.due += (missed + 1) * entry.interval
+                self.conn.execute("UPDATE scheduled_broadcasts SET due = ? WHERE id = ?", (entry.due, entry.id))
+                heapq.heappush(self.heap, (entry.due, entry.id))
+                return fired
+            del self.entries[entry_id]
+            self.conn.execute("DELETE FROM scheduled_broadcasts WHERE id = ?", (entry_id,))
+            return entry
+
+    def run(self):
+        while True:
+            with self.wakeup:
+                entry = self.next_due()
+            logger.info(f"Firing scheduled broadcast {entry.id} (due {format_time(entry.due)})")
+            try:
+                self.fire(entry)
+            except Exception as e:
+                logger.error(f"Scheduled broadcast {entry.id} failed: {e}")
+            # Spread out drops that came due together
+            time.sleep(self.min_gap)
@@ -0,0 +1,126 @@
+import logging
+import multiprocessing
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from itertools import islice
+from typing import Iterable, Iterator, List, Tuple
+
+from config import BROADCAST_PROCESSES, BROADCAST_SHARD_SIZE
+from broadcast import BroadcastEngine, PreparedBroadcast
+from bot_api import BotApiClient
+from metrics import api_metrics
+from rate_limit import SharedBudget, rate_limiter
+
+logger = logging.getLogger(__name__)
+
+# Per-process state of a broadcast worker, set up once by _init_worker
+_client = None
+_engine = None
+
+def _init_worker(budget: SharedBudget):
+    global _client, _engine
+    rate_limiter.use_shared_budget(budget)
+    _client = BotApiClient()
+    _engine = BroadcastEngine()
+
+def _summarise(result: dict) -> dict:
+    """The parts of an API result the bot acts on, so little has to travel back to the parent"""
+    return {key: result[key] for key in ("ok", "error_code", "description", "error") if key in result}
+
+def _send_shard(shard: Tuple[str, dict, List[int]]) -> Tuple[List[Tuple[int, dict]], dict]:
+    """Send one shard of a broadcast from a worker process; return its results and API metrics"""
+    method, params, targets = shard
+    prepared = PreparedBroadcast(method, params)
+    send = lambda chat_id: _client.send_prepared(chat_id, prepared)
+    results = [(chat_id, _summarise(result)) for chat_id, result in _engine.fan_out(targets, send)]
+    return results, api_metrics.drain()
+
+def _chunks(targets: Iterable[int], size: int) -> Iterator[List[int]]:
+    targets = iter(targets)
+    while True:
+        chunk = list(islice(targets, size))
+        if not chunk:
+            return
+        yield chunk
+
+class ShardedBroadcaster:
+    """Spread a broadcast's targets over a pool of worker processes
+
+    Each worker has its own HTTP session and send threads, so request
+    encoding, response parsing and logging run on every core instead of
+    one. Every process, this one included, takes its global send budget
+    and flood-control pauses from one SharedBudget, so together they
+    still respect Telegram's overall limit. Targets go out in small shards
+    and results come back per shard, so the caller can record deliveries
+    and report progress while the broadcast runs.
+
+    A shard is only handed out when a worker is free, and its targets are
+    read from the caller's iterator at that moment. A caller that holds
+    targets back (BroadcastLanes.gated) therefore stops the broadcast
+    within one shard per worker: at most processes * shard_size sends
+    still complete after it starts holding back.
+
+    If a shard fails, or a worker process dies and breaks the pool, no
+    more shards are handed out, but the shards already in flight are
+    waited for and their results yielded, so the caller records every
+    delivery that is known before the error is raised. A broken pool is
+    replaced on the next broadcast.
+    """
+
+    def __init__(self, processes: int = BROADCAST_PROCESSES, shard_size: int = BROADCAST_SHARD_SIZE):
+        self.processes = processes
+        self.shard_size = max(1, shard_size)
+        # Workers are spawned fresh rather than forked from a process full of threads and open connections
+        self.context = multiprocessing.get_context("spawn")
+        self.budget = SharedBudget(context=self.context)
+        rate_limiter.use_shared_budget(self.budget)
+        self.pool = None
+
+    def start(self) -> ProcessPoolExecutor:
+        """Start the worker pool on first use and keep it for later broadcasts"""
+        if self.pool is None:
+            logger.info(f"Starting {self.processes} broadcast worker processes")
+            self.pool = ProcessPoolExecutor(self.processes, mp_context=self.context,
+                                            initializer=_init_worker, initargs=(self.budget,))
+        return self.pool
+
+    def fan_out(self, targets: Iterable[int], prepared: PreparedBroadcast) -> Iterator[Tuple[int, dict]]:
+        """Send to every target, yielding (chat_id, result) as each shard completes"""
+        # Shards are handed out from the caller's thread rather than through
+        # map, which reads ahead of the workers and would pull targets past a
+        # gate that is holding them back
+        pool = self.start()
+        shards = _chunks(targets, self.shard_size)
+        in_flight = set()
+        error = None
+        while True:
+            while error is None and len(in_flight) < self.processes:
+                shard = next(shards, None)
+                if shard is None:
+                    break
+                in_flight.add(pool.submit(_send_shard, (prepared.method, prepared.params, shard)))
+
+            if not in_flight:
+                break
+
+            done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    results, metrics = future.result()
+                except Exception as e:
+                    error = error or e
+                    continue
+                api_metrics.merge(metrics)
+                yield from results
+
+        if error is not None:
+            if isinstance(error, BrokenProcessPool):
+                logger.error("A broadcast worker process died; restarting the pool on the next broadcast")
+                self.shutdown()
+            raise error
+
+    def shutdown(self):
+        """Stop the worker processes"""
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+            self.pool = None
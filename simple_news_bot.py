@@ -1,19 +1,31 @@
-from keep_alive import keep_alive
-keep_alive()
 #!/usr/bin/env python3
-import json
 import logging
+import secrets
+import threading
 import time
-import requests
-from datetime import datetime
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
 
 # Import configuration
-from config import BOT_TOKEN, ADMIN_ID, GROUPS_FILE, BOT_USERNAME
+from config import (
+    ADMIN_ID, BOT_USERNAME, BROADCAST_PROCESSES, BROADCAST_SHARD_MIN, WEBHOOK_URL, WEBHOOK_PATH, WEBHOOK_SECRET, POLL_TIMEOUT
+)
+from keep_alive import keep_alive, set_update_handler
+from poller import UpdatePoller, HTTP_TIMEOUT_MARGIN
+from dispatcher import UpdateDispatcher
+from albums import MediaGroupAggregator
+from jobs import JobStore, BroadcastJob, BroadcastRun
+from update_log import UpdateLog
+from broadcast import BroadcastEngine, BroadcastProgress, PreparedBroadcast, format_duration
+from utils import GroupManager
+from metrics import lane_metrics, bot_status
+from bot_api import BotApiClient, BASE_URL
+from sharding import ShardedBroadcaster
+from bot_pool import BotPool
+from broadcast_queue import BroadcastLanes, URGENT, ROUTINE, lane_for
+from scheduler import BroadcastScheduler, ScheduledBroadcast, parse_schedule, format_time, format_interval
 
 # Bot configuration
 ADMIN_IDS = [ADMIN_ID, 5716244784, 6654985327, 6510157572]  # Multiple admins including primary
-BASE_URL = f"https://api.telegram.org/bot{BOT_TOKEN}"
 
 # Set up logging
 logging.basicConfig(
@@ -22,104 +34,171 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-class GroupManager:
-    def __init__(self):
-        self.groups_file = GROUPS_FILE
-        self.groups = self.load_groups()
+ADMIN_ONLY_TEXT = "❌ Sirf admin hi yeh command use kar sakte hain."
+NO_GROUPS_TEXT = (
+    "📭 Koi active groups nahi hain broadcast karne ke liye.\n"
+    "Bot ko groups mein admin banake add kariye broadcasting start karne ke liye!"
+)
+
+def start_reply(chat: dict, user: dict) -> Tuple[str, Optional[str]]:
+    """Build the /start reply text and parse mode for a chat"""
+    if chat["type"] != "private":
+        # Bot added to group
+        return (
+            "✅ Namaste! Main ab is group se connected hun.\n\n"
+            "Main apne admin se news aur updates forward karunga. "
+            "Please mujhe admin permissions dein messages send karne ke liye!"
+        ), None
+    if user["id"] in ADMIN_IDS:
+        return (
+            "🎯 *Admin Panel*\n\n"
+            "Aap ab koi bhi message send kar sakte hain aur yeh sabhi connected groups mein forward ho jayega.\n\n"
+            "*Available Commands:*\n"
+            "/status - Bot ki status check karein\n"
+            "/groups - Connected groups ki list dekhen\n"
+            "/help - Help message dekhen"
+        ), "Markdown"
+    return (
+        "👋 Namaste! Main ek news broadcasting bot hun.\n\n"
+        "Mujhe apne group mein admin banake add kariye news updates receive karne ke liye!"
+    ), None
+
+def help_text(user_id: int) -> str:
+    """Build the /help text for admins or regular users"""
+    if user_id in ADMIN_IDS:
+        return (
+            "🤖 *Admin Help*\n\n"
+            "*Kaise use karein:*\n"
+            "• Koi bhi message mujhe send kariye aur main sabhi groups mein forward kar dunga\n"
+            "• Text, photos, videos, documents sab support hai\n\n"
+            "*Commands:*\n"
+            "/start - Bot start karein\n"
+            "/status - Bot status check karein\n"
+            "/groups - Connected groups list\n"
+            "/bots - Bot pool aur har bot ke groups\n"
+            "/syncbots - Pool bots ke groups dobara check karein\n"
+            "/schedule - Agla message baad mein bhejein (e.g. `/schedule 18:30 daily`)\n"
+            "/scheduled - Scheduled broadcasts list\n"
+            "/unschedule - Scheduled broadcast cancel karein\n"
+            "/help - Yeh help message\n\n"
+            "*Features:*\n"
+            "• Automatic group detection\n"
+            "• Error handling aur logging\n"
+            "• Sabhi message types ka support"
+        )
+    return (
+        "🤖 *Bot Help*\n\n"
+        "Main ek news broadcasting bot hun jo apne admin se updates forward karta hun.\n\n"
+        "*Updates receive karne ke liye:*\n"
+        "1. Mujhe apne group mein add kariye\n"
+        "2. Mujhe admin banayiye\n"
+        "3. Aap automatically news updates receive karenge!\n\n"
+        "Koi issue ho to mere admin se contact kariye."
+    )
+
+def status_text(group_count: int) -> str:
+    """Build the /status text"""
+    return (
+        f"🤖 *Bot Status*\n\n"
+        f"✅ Bot chal raha hai\n"
+        f"📊 Connected groups: {group_count}\n"
+        f"👥 Admins: {len(ADMIN_IDS)}\n\n"
+        f"Messages broadcast karne ke liye ready!"
+    )
+
+def group_event_text(heading: str, chat: dict, group_count: int) -> str:
+    """Build the admin notification for a group join/leave"""
+    admin_message = f"{heading}\n\n"
+    admin_message += f"📝 Name: {chat.get('title', 'Unknown')}\n"
+    admin_message += f"🆔 ID: {chat['id']}\n"
+    admin_message += f"📊 Total Groups: {group_count}"
+    return admin_message
+
+def broadcast_status_text(success_count: int, failed_count: int) -> str:
+    """Build the summary shown to the admin after a broadcast"""
+    status_text = f"📤 *Broadcast Complete!*\n\n"
+    status_text += f"✅ Successfully sent: {success_count} groups\n"
     
-    def load_groups(self) -> Dict:
-        """Load groups from JSON file"""
-        try:
-            with open(self.groups_file, 'r') as f:
-                return json.load(f)
-        except FileNotFoundError:
-            logger.info("Groups file not found, creating new one")
-            return {}
-        except json.JSONDecodeError:
-            logger.error("Invalid JSON in groups file, starting fresh")
-            return {}
-    
-    def save_groups(self):
-        """Save groups to JSON file"""
-        try:
-            with open(self.groups_file, 'w') as f:
-                json.dump(self.groups, f, indent=2)
-            logger.info(f"Saved {len(self.groups)} groups to file")
-        except Exception as e:
-            logger.error(f"Error saving groups: {e}")
-    
-    def add_group(self, chat_id: int, chat_title: str, chat_type: str):
-        """Add a new group to tracking"""
-        group_id = str(chat_id)
-        self.groups[group_id] = {
-            'id': chat_id,
-            'title': chat_title,
-            'type': chat_type,
-            'active': True,
-            'added_date': str(datetime.now())
-        }
-        self.save_groups()
-        logger.info(f"Added group: {chat_title} ({chat_id})")
-    
-    def remove_group(self, chat_id: int):
-        """Remove a group from tracking"""
-        group_id = str(chat_id)
-        if group_id in self.groups:
-            del self.groups[group_id]
-            self.save_groups()
-            logger.info(f"Removed group: {chat_id}")
-    
-    def deactivate_group(self, chat_id: int):
-        """Mark a group as inactive (bot removed/blocked)"""
-        group_id = str(chat_id)
-        if group_id in self.groups:
-            self.groups[group_id]['active'] = False
-            self.save_groups()
-            logger.info(f"Deactivated group: {chat_id}")
-    
-    def get_active_groups(self) -> List[int]:
-        """Get list of active group IDs"""
-        return [
-            group['id'] for group in self.groups.values() 
-            if group.get('active', True)
-        ]
-    
-    def get_group_count(self) -> int:
-        """Get count of active groups"""
-        return len([g for g in self.groups.values() if g.get('active', True)])
-    
-    def get_groups_info(self) -> str:
-        """Get formatted string with groups information"""
-        active_groups = [g for g in self.groups.values() if g.get('active', True)]
-        if not active_groups:
-            return "📭 No active groups connected"
-        
-        info = f"📊 *Active Groups: {len(active_groups)}*\n\n"
-        for group in active_groups:
-            info += f"• {group['title']} ({group['type']})\n"
-        
-        return info
+    if failed_count > 0:
+        status_text += f"❌ Failed: {failed_count} groups\n"
+        status_text += f"💡 Failed groups have been deactivated"
+    return status_text
+
+def broadcast_progress_text(progress: BroadcastProgress) -> str:
+    """Build the live status shown to the admin while a broadcast runs"""
+    progress_text = f"📤 *Broadcast chal raha hai...*\n\n"
+    progress_text += f"✅ Sent: {progress.sent}\n"
+    progress_text += f"❌ Failed: {progress.failed}\n"
+    progress_text += f"⏳ Baaki: {progress.remaining} / {progress.total}\n"
+    progress_text += f"⚡ Speed: {progress.throughput:.1f} msgs/sec\n"
+    progress_text += f"🕒 ETA: {format_duration(progress.eta)}"
+    return progress_text
+
+def pool_text(pool: BotPool) -> str:
+    """Build the /bots text: every bot in the pool and how many groups it serves"""
+    loads = pool.loads()
+    pool_text = f"🤖 *Bot Pool*\n\n"
+    pool_text += f"• Primary bot: {loads[None]} groups\n"
+    for bot_id, username in pool.usernames.items():
+        pool_text += f"• @{username}: {loads[bot_id]} groups\n"
+    if not pool.bots:
+        pool_text += f"\n💡 Extra bots add karne ke liye BOT_TOKENS set kariye"
+    return pool_text
+
+SCHEDULE_USAGE_TEXT = (
+    "⏰ *Schedule kaise karein:*\n\n"
+    "`/schedule 30m` - 30 minute baad\n"
+    "`/schedule 18:30` - Aaj/kal 18:30 baje\n"
+    "`/schedule 2026-01-26 09:00` - Us date aur time par\n"
+    "`/schedule 09:00 daily` - Roz 09:00 baje (hourly, weekly bhi)\n"
+    "`/schedule every 6h` - Har 6 ghante\n\n"
+    "Command ke baad jo message bhejenge woh schedule ho jayega.\n"
+    "`/unschedule` - Schedule karna cancel karein"
+)
+
+def scheduled_text(entries: List[ScheduledBroadcast]) -> str:
+    """Build the /scheduled list"""
+    if not entries:
+        return "📭 Koi scheduled broadcast nahi hai."
+    scheduled_text = f"⏰ *Scheduled Broadcasts ({len(entries)}):*\n\n"
+    for entry in entries:
+        scheduled_text += f"#{entry.id} - {format_time(entry.due)}"
+        if entry.interval:
+            scheduled_text += f" (har {format_interval(entry.interval)})"
+        scheduled_text += f" - {entry.prepared.method}\n"
+    scheduled_text += f"\nCancel karne ke liye: `/unschedule <id>`"
+    return scheduled_text
+
+def startup_text(bot_info: dict, group_count: int) -> str:
+    """Build the startup notification sent to all admins"""
+    startup_msg = f"🤖 *Bot Successfully Started!*\n\n"
+    startup_msg += f"🏷️ Username: @{bot_info['username']}\n"
+    startup_msg += f"📊 Connected Groups: {group_count}\n"
+    startup_msg += f"👥 Admins: {len(ADMIN_IDS)}\n\n"
+    startup_msg += f"✅ Ready for broadcasting!"
+    return startup_msg
 
-class TelegramBot:
+class TelegramBot(BotApiClient):
     def __init__(self):
+        super().__init__(BASE_URL)
         self.group_manager = GroupManager()
-        self.base_url = BASE_URL
-        self.last_update_id = 0
+        self.update_log = UpdateLog()
+        self.last_update_id = self.update_log.offset - 1
         self.bot_username = None
-        
-    def make_request(self, method: str, params: dict = None) -> dict:
-        """Make a request to Telegram API"""
-        url = f"{self.base_url}/{method}"
-        try:
-            response = requests.post(url, json=params or {}, timeout=10)
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.Timeout:
-            logger.warning(f"Timeout for {method}, retrying...")
-            return {"ok": False, "error": "timeout"}
-        except requests.exceptions.RequestException as e:
-            logger.error(f"API request failed: {e}")
-            return {"ok": False, "error": str(e)}
+        self.broadcaster = BroadcastEngine()
+        self.sharded = ShardedBroadcaster() if BROADCAST_PROCESSES > 1 else None
+        self.pool = BotPool(self, self.group_manager)
+        self.scheduler = BroadcastScheduler(self.fire_scheduled)
+        # Admin chat -> (due, interval) for a /schedule waiting for the message to send
+        self.schedule_requests: Dict[int, Tuple[float, Optional[float]]] = {}
+        self.dispatcher = UpdateDispatcher(self.handle_update)
+        self.albums = MediaGroupAggregator(self.submit_album)
+        self.jobs = JobStore()
+        self.lanes = BroadcastLanes(self.run_broadcast_job)
+        bot_status.register_gauge("drct_update_queue_depth", "Updates queued or being processed", self.dispatcher.pending)
+        bot_status.register_gauge("drct_active_groups", "Groups receiving broadcasts", self.group_manager.get_group_count)
+        bot_status.register_gauge("drct_scheduled_broadcasts", "Broadcasts waiting for their time", self.scheduler.pending)
+        bot_status.register_gauge("drct_broadcast_jobs_queued", "Broadcast jobs waiting or running", self.lanes.pending)
     
     def send_message(self, chat_id: int, text: str, parse_mode: str = None, reply_to_message_id: int = None) -> dict:
         """Send a message to a chat"""
@@ -193,12 +272,13 @@ class TelegramBot:
         }
         return self.make_request("forwardMessage", params)
     
-    def get_updates(self, offset: int = None, timeout: int = 10) -> dict:
+    def get_updates(self, offset: int = None, timeout: int = POLL_TIMEOUT) -> dict:
         """Get updates from Telegram"""
         params = {"timeout": timeout}
         if offset:
             params["offset"] = offset
-        return self.make_request("getUpdates", params)
+        # The HTTP timeout must outlast the long-poll timeout
+        return self.make_request("getUpdates", params, timeout=timeout + HTTP_TIMEOUT_MARGIN)
     
     def get_me(self) -> dict:
         """Get bot information"""
@@ -207,59 +287,7 @@ class TelegramBot:
     def send_message_as_bot(self, chat_id: int, message: dict) -> dict:
         """Send a message as the bot without revealing admin identity"""
         try:
-            # Handle different message types
-            if "photo" in message:
-                # Photo message
-                largest_photo = max(message["photo"], key=lambda x: x["file_size"])
-                photo_file_id = largest_photo["file_id"]
-                caption = message.get("caption", "")
-                
-                # Add bot signature to caption
-                if caption:
-                    caption = f"{caption}\n\n— DRCT NEWS"
-                else:
-                    caption = "— DRCT NEWS"
-                    
-                return self.send_photo(chat_id, photo_file_id, caption)
-                
-            elif "video" in message:
-                # Video message
-                video_file_id = message["video"]["file_id"]
-                caption = message.get("caption", "")
-                
-                if caption:
-                    caption = f"{caption}\n\n— DRCT NEWS"
-                else:
-                    caption = "— DRCT NEWS"
-                    
-                return self.send_video(chat_id, video_file_id, caption)
-                
-            elif "document" in message:
-                # Document message
-                document_file_id = message["document"]["file_id"]
-                caption = message.get("caption", "")
-                
-                if caption:
-                    caption = f"{caption}\n\n— DRCT NEWS"
-                else:
-                    caption = "— DRCT NEWS"
-                    
-                return self.send_document(chat_id, document_file_id, caption)
-                
-            elif "text" in message:
-                # Text message
-                text = message["text"]
-                text_with_signature = f"{text}\n\n— DRCT NEWS"
-                return self.send_message(chat_id, text_with_signature)
-                
-            else:
-                # For other message types, try to copy but add signature in separate message
-                result = self.copy_message(chat_id, message["chat"]["id"], message["message_id"])
-                if result.get("ok"):
-                    # Send signature as separate message
-                    self.send_message(chat_id, "— DRCT NEWS")
-                return result
-                
+            return self.send_prepared(chat_id, PreparedBroadcast.from_message(message))
         except Exception as e:
             logger.error(f"Error sending message as bot: {e}")
             return {"ok": False, "error": str(e)}
@@ -268,68 +296,14 @@ class TelegramBot:
         """Handle /start command"""
         chat = update["message"]["chat"]
         user = update["message"]["from"]
-        chat_id = chat["id"]
-        
-        if chat["type"] == "private":
-            if user["id"] in ADMIN_IDS:
-                self.send_message(
-                    chat_id,
-                    "🎯 *Admin Panel*\n\n"
-                    "Aap ab koi bhi message send kar sakte hain aur yeh sabhi connected groups mein forward ho jayega.\n\n"
-                    "*Available Commands:*\n"
-                    "/status - Bot ki status check karein\n"
-                    "/groups - Connected groups ki list dekhen\n"
-                    "/help - Help message dekhen",
-                    parse_mode="Markdown"
-                )
-            else:
-                self.send_message(
-                    chat_id,
-                    "👋 Namaste! Main ek news broadcasting bot hun.\n\n"
-                    "Mujhe apne group mein admin banake add kariye news updates receive karne ke liye!"
-                )
-        else:
-            # Bot added to group
-            self.send_message(
-                chat_id,
-                "✅ Namaste! Main ab is group se connected hun.\n\n"
-                "Main apne admin se news aur updates forward karunga. "
-                "Please mujhe admin permissions dein messages send karne ke liye!"
-            )
+        text, parse_mode = start_reply(chat, user)
+        self.send_message(chat["id"], text, parse_mode=parse_mode)
     
     def handle_help_command(self, update: dict):
         """Handle /help command"""
         user = update["message"]["from"]
         chat_id = update["message"]["chat"]["id"]
-        
-        if user["id"] in ADMIN_IDS:
-            help_text = (
-                "🤖 *Admin Help*\n\n"
-                "*Kaise use karein:*\n"
-                "• Koi bhi message mujhe send kariye aur main sabhi groups mein forward kar dunga\n"
-                "• Text, photos, videos, documents sab support hai\n\n"
-                "*Commands:*\n"
-                "/start - Bot start karein\n"
-                "/status - Bot status check karein\n"
-                "/groups - Connected groups list\n"
-                "/help - Yeh help message\n\n"
-                "*Features:*\n"
-                "• Automatic group detection\n"
-                "• Error handling aur logging\n"
-                "• Sabhi message types ka support"
-            )
-        else:
-            help_text = (
-                "🤖 *Bot Help*\n\n"
-                "Main ek news broadcasting bot hun jo apne admin se updates forward karta hun.\n\n"
-                "*Updates receive karne ke liye:*\n"
-                "1. Mujhe apne group mein add kariye\n"
-                "2. Mujhe admin banayiye\n"
-                "3. Aap automatically news updates receive karenge!\n\n"
-                "Koi issue ho to mere admin se contact kariye."
-            )
-        
-        self.send_message(chat_id, help_text, parse_mode="Markdown")
+        self.send_message(chat_id, help_text(user["id"]), parse_mode="Markdown")
     
     def handle_status_command(self, update: dict):
         """Handle /status command"""
@@ -337,19 +311,11 @@ class TelegramBot:
         chat_id = update["message"]["chat"]["id"]
         
         if user["id"] not in ADMIN_IDS:
-            self.send_message(chat_id, "❌ Sirf admin hi yeh command use kar sakte hain.")
+            self.send_message(chat_id, ADMIN_ONLY_TEXT)
             return
         
         group_count = self.group_manager.get_group_count()
-        status_text = (
-            f"🤖 *Bot Status*\n\n"
-            f"✅ Bot chal raha hai\n"
-            f"📊 Connected groups: {group_count}\n"
-            f"👥 Admins: {len(ADMIN_IDS)}\n\n"
-            f"Messages broadcast karne ke liye ready!"
-        )
-        
-        self.send_message(chat_id, status_text, parse_mode="Markdown")
+        self.send_message(chat_id, status_text(group_count), parse_mode="Markdown")
     
     def handle_groups_command(self, update: dict):
         """Handle /groups command"""
@@ -357,12 +323,98 @@ class TelegramBot:
         chat_id = update["message"]["chat"]["id"]
         
         if user["id"] not in ADMIN_IDS:
-            self.send_message(chat_id, "❌ Sirf admin hi yeh command use kar sakte hain.")
+            self.send_message(chat_id, ADMIN_ONLY_TEXT)
             return
         
         groups_info = self.group_manager.get_groups_info()
         self.send_message(chat_id, groups_info, parse_mode="Markdown")
     
+    def handle_bots_command(self, update: dict):
+        """Handle /bots command"""
+        user = update["message"]["from"]
+        chat_id = update["message"]["chat"]["id"]
+        
+        if user["id"] not in ADMIN_IDS:
+            self.send_message(chat_id, ADMIN_ONLY_TEXT)
+            return
+        
+        self.send_message(chat_id, pool_text(self.pool), parse_mode="Markdown")
+    
+    def handle_syncbots_command(self, update: dict):
+        """Handle /syncbots command: re-check which pool bots are in each group"""
+        user = update["message"]["from"]
+        chat_id = update["message"]["chat"]["id"]
+        
+        if user["id"] not in ADMIN_IDS:
+            self.send_message(chat_id, ADMIN_ONLY_TEXT)
+            return
+        
+        if not self.pool.bots:
+            self.send_message(chat_id, pool_text(self.pool), parse_mode="Markdown")
+            return
+        
+        def sync():
+            # One getChatMember per group and pool bot, so keep it off the update workers
+            moved = self.pool.discover(self.group_manager.get_active_groups())
+            self.send_message(chat_id, f"✅ Sync complete: {moved} groups reassigned\n\n{pool_text(self.pool)}",
+                              parse_mode="Markdown")
+        
+        self.send_message(chat_id, "🔄 Pool bots ke groups check ho rahe hain...")
+        threading.Thread(target=sync, daemon=True).start()
+    
+    def handle_schedule_command(self, update: dict):
+        """Handle /schedule command: the admin's next message is scheduled instead of sent"""
+        user = update["message"]["from"]
+        chat_id = update["message"]["chat"]["id"]
+        
+        if user["id"] not in ADMIN_IDS:
+            self.send_message(chat_id, ADMIN_ONLY_TEXT)
+            return
+        
+        try:
+            due, interval = parse_schedule(update["message"]["text"].split()[1:])
+        except ValueError as e:
+            self.send_message(chat_id, f"❌ {e}\n\n{SCHEDULE_USAGE_TEXT}", parse_mode="Markdown")
+            return
+        
+        self.schedule_requests[chat_id] = (due, interval)
+        when = format_time(due) + (f", phir har {format_interval(interval)}" if interval else "")
+        self.send_message(chat_id, f"⏰ {when}\nAb woh message bhejiye jo schedule karna hai.")
+    
+    def handle_scheduled_command(self, update: dict):
+        """Handle /scheduled command"""
+        user = update["message"]["from"]
+        chat_id = update["message"]["chat"]["id"]
+        
+        if user["id"] not in ADMIN_IDS:
+            self.send_message(chat_id, ADMIN_ONLY_TEXT)
+            return
+        
+        self.send_message(chat_id, scheduled_text(self.scheduler.upcoming()), parse_mode="Markdown")
+    
+    def handle_unschedule_command(self, update: dict):
+        """Handle /unschedule command: cancel a scheduled broadcast, or a /schedule still waiting for its message"""
+        user = update["message"]["from"]
+        chat_id = update["message"]["chat"]["id"]
+        
+        if user["id"] not in ADMIN_IDS:
+            self.send_message(chat_id, ADMIN_ONLY_TEXT)
+            return
+        
+        args = update["message"]["text"].split()[1:]
+        if not args:
+            if self.schedule_requests.pop(chat_id, None):
+                self.send_message(chat_id, "✅ Schedule cancel ho gaya, agla message turant broadcast hoga.")
+            else:
+                self.send_message(chat_id, "Usage: `/unschedule <id>` (IDs ke liye /scheduled)", parse_mode="Markdown")
+            return
+        
+        entry_id = args[0].lstrip("#")
+        if entry_id.isdigit() and self.scheduler.cancel(int(entry_id)):
+            self.send_message(chat_id, f"✅ Scheduled broadcast #{entry_id} cancel ho gaya.")
+        else:
+            self.send_message(chat_id, f"❌ Scheduled broadcast {args[0]} nahi mila.")
+    
     def handle_group_updates(self, update: dict):
         """Handle bot being added to or removed from groups"""
         message = update.get("message", {})
@@ -381,13 +433,16 @@ class TelegramBot:
                     logger.info(f"Bot added to group: {chat.get('title')} ({chat['id']})")
                     
                     # Notify all admins
-                    admin_message = f"🎉 *Naya Group Connected!*\n\n"
-                    admin_message += f"📝 Name: {chat.get('title', 'Unknown')}\n"
-                    admin_message += f"🆔 ID: {chat['id']}\n"
-                    admin_message += f"📊 Total Groups: {self.group_manager.get_group_count()}"
+                    admin_message = group_event_text("🎉 *Naya Group Connected!*", chat, self.group_manager.get_group_count())
                     
                     for admin_id in ADMIN_IDS:
                         self.send_message(admin_id, admin_message, parse_mode="Markdown")
+                
+                # A pool bot joined a group we already serve; it may take over some of the load
+                pool_bot_id = self.pool.bot_id_for(member.get("username"))
+                if pool_bot_id and chat["id"] in self.group_manager.get_bot_assignments():
+                    current = self.group_manager.get_bot_assignments()[chat["id"]]
+                    self.pool.assign(chat["id"], [current, pool_bot_id])
         
         # Check if bot was removed from group
         if "left_chat_member" in message:
@@ -398,13 +453,15 @@ class TelegramBot:
                 logger.info(f"Bot removed from group: {chat.get('title')} ({chat['id']})")
                 
                 # Notify all admins
-                admin_message = f"❌ *Group Disconnected*\n\n"
-                admin_message += f"📝 Name: {chat.get('title', 'Unknown')}\n"
-                admin_message += f"🆔 ID: {chat['id']}\n"
-                admin_message += f"📊 Total Groups: {self.group_manager.get_group_count()}"
+                admin_message = group_event_text("❌ *Group Disconnected*", chat, self.group_manager.get_group_count())
                 
                 for admin_id in ADMIN_IDS:
                     self.send_message(admin_id, admin_message, parse_mode="Markdown")
+            
+            # A pool bot left; the primary bot takes the group back
+            pool_bot_id = self.pool.bot_id_for(left_member.get("username"))
+            if pool_bot_id and self.group_manager.get_bot_assignments().get(chat["id"]) == pool_bot_id:
+                self.group_manager.assign_bot(chat["id"], None)
     
     def broadcast_message(self, update: dict):
         """Handle messages from admin and broadcast to all groups"""
@@ -420,62 +477,159 @@ class TelegramBot:
         if message.get("text", "").startswith('/'):
             return
         
-        active_groups = self.group_manager.get_active_groups()
+        # Album items arrive as separate updates; collect them and broadcast once
+        if message.get("media_group_id") and "album" not in update:
+            self.albums.add(update)
+            return
         
-        if not active_groups:
+        # Build and serialise the outgoing request once; each group then
+        # costs one call with only its chat_id spliced in
+        if "album" in update:
+            prepared = PreparedBroadcast.from_album(update["album"])
+        else:
+            prepared = PreparedBroadcast.from_message(message)
+        
+        # A /schedule is waiting for this message; keep it for later instead
+        schedule = self.schedule_requests.pop(chat_id, None)
+        if schedule:
+            entry = self.scheduler.add(chat_id, prepared, *schedule)
             self.send_message(
                 chat_id,
-                "📭 Koi active groups nahi hain broadcast karne ke liye.\n"
-                "Bot ko groups mein admin banake add kariye broadcasting start karne ke liye!"
+                f"⏰ Broadcast #{entry.id} schedule ho gaya: {format_time(entry.due)}\n"
+                f"Message delete mat kariye, bhejte waqt wahi copy hoga.\n"
+                f"Cancel: /unschedule {entry.id}"
             )
             return
         
-        success_count = 0
-        failed_count = 0
+        self.start_broadcast(chat_id, prepared, "📤 Message broadcast kar raha hun")
+    
+    def start_broadcast(self, admin_chat_id: int, prepared: PreparedBroadcast, heading: str):
+        """Create a job for every active group, tell the admin, and queue it in its priority lane"""
+        active_groups = self.group_manager.get_active_groups()
+        
+        if not active_groups:
+            self.send_message(admin_chat_id, NO_GROUPS_TEXT)
+            return
+        
+        # Persist the job before any API call so a restart can pick up where it left off
+        job = self.jobs.create_job(admin_chat_id, prepared, active_groups)
+        lane = lane_for(prepared)
+        if lane == URGENT:
+            heading = f"🚨 *Urgent* - {heading}"
         
         # Send "sending" notification to admin
         sending_response = self.send_message(
-            chat_id,
-            f"📤 Message broadcast kar raha hun {len(active_groups)} groups mein...",
+            admin_chat_id,
+            f"{heading} {len(active_groups)} groups mein...",
             parse_mode="Markdown"
         )
-        
-        # Broadcast to all active groups
-        for group_id in active_groups:
-            try:
-                result = self.send_message_as_bot(group_id, message)
-                if result.get("ok"):
-                    success_count += 1
-                    logger.info(f"Message sent to group {group_id}")
-                else:
-                    failed_count += 1
-                    logger.error(f"Failed to send to group {group_id}: {result}")
-                    if "chat not found" in str(result).lower() or "bot was blocked" in str(result).lower():
-                        self.group_manager.deactivate_group(group_id)
-                        
-            except Exception as e:
-                failed_count += 1
-                logger.error(f"Unexpected error for group {group_id}: {e}")
-        
-        # Update the status message
-        status_text = f"📤 *Broadcast Complete!*\n\n"
-        status_text += f"✅ Successfully sent: {success_count} groups\n"
-        
-        if failed_count > 0:
-            status_text += f"❌ Failed: {failed_count} groups\n"
-            status_text += f"💡 Failed groups have been deactivated"
-        
-        # Edit the sending message to show results
         if sending_response.get("ok"):
-            message_id = sending_response["result"]["message_id"]
+            self.jobs.set_status_message(job, sending_response["result"]["message_id"])
+        
+        # The lane runs the job, so this chat's next message (maybe breaking news) isn't held up
+        self.lanes.submit(job, lane)
+    
+    def fire_scheduled(self, entry: ScheduledBroadcast):
+        """Send a scheduled broadcast whose time has come"""
+        self.start_broadcast(entry.admin_chat_id, entry.prepared, f"⏰ Scheduled broadcast #{entry.id} bhej raha hun")
+    
+    def run_broadcast_job(self, job: BroadcastJob, lane: str = ROUTINE):
+        """Send a job to its pending targets, recording each delivery as it happens
+
+        Targets are drawn through the lane's gate, so a routine job pauses in
+        place while an urgent one is waiting or running.
+        """
+        prepared = job.prepared
+        with BroadcastRun(self.jobs, job, self.group_manager) as run:
+            targets = run.targets
+            
+            # Broadcast to all pending groups concurrently. With extra bot tokens
+            # each group goes out from its assigned bot, each with its own rate
+            # budget; otherwise large audiences are split across worker processes
+            # sharing one budget
+            gate = lambda order: self.lanes.gated(lane, order)
+            if self.pool.bots:
+                results = self.pool.fan_out(targets, prepared, gate)
+            elif self.sharded and len(targets) >= BROADCAST_SHARD_MIN:
+                results = self.sharded.fan_out(gate(targets), prepared)
+            else:
+                send = lambda group_id: self.send_prepared(group_id, prepared)
+                results = self.broadcaster.fan_out(gate(targets), send)
+            
+            for group_id, result in results:
+                lane_metrics.sent(lane)
+                if run.record_result(group_id, result):
+                    self.edit_status_message(job, broadcast_progress_text(run.progress))
+            
+            success_count, failed_count = run.finish()
+        logger.info(f"Lanes after broadcast job {job.id} ({lane}):\n{lane_metrics.summary()}")
+        self.edit_status_message(job, broadcast_status_text(success_count, failed_count))
+    
+    def edit_status_message(self, job: BroadcastJob, text: str):
+        """Replace the text of a job's status message, if it has one"""
+        if job.status_message_id:
             edit_params = {
-                "chat_id": chat_id,
-                "message_id": message_id,
-                "text": status_text,
+                "chat_id": job.admin_chat_id,
+                "message_id": job.status_message_id,
+                "text": text,
                 "parse_mode": "Markdown"
             }
             self.make_request("editMessageText", edit_params)
     
+    def resume_broadcasts(self):
+        """Finish broadcasts interrupted by a crash or redeploy"""
+        self.jobs.prune()
+        for job in self.jobs.unfinished_jobs():
+            logger.info(f"Resuming broadcast job {job.id}")
+            self.lanes.submit(job)
+    
+    def submit_album(self, updates: List[dict]):
+        """Queue a completed album as one update so it is broadcast in a single pass"""
+        self.dispatcher.submit({
+            "update_id": updates[-1]["update_id"],
+            "message": updates[0]["message"],
+            "album": [u["message"] for u in updates],
+            "parts": [u["update_id"] for u in updates]
+        })
+    
+    def receive_updates(self, updates: List[dict], offset: int = None):
+        """Record updates durably, then queue them for processing"""
+        self.update_log.record_fetched(updates, offset)
+        for update in updates:
+            self.last_update_id = update["update_id"]
+            self.dispatcher.submit(update)
+    
+    def handle_update(self, update: dict):
+        """Process an update unless its message was already handled, then clear it from the inbox
+
+        Album parts are neither claimed nor cleared on their own. They stay
+        in the inbox while buffered, and the assembled album claims its
+        first message and clears every part once its job (or schedule) is
+        on disk, so a restart part way through replays the whole album.
+        """
+        message = update.get("message")
+        album_part = bool(message and message.get("media_group_id")) and "album" not in update
+        try:
+            if message and not album_part:
+                if not self.update_log.claim(message["chat"]["id"], message["message_id"]):
+                    logger.info(f"Skipping already handled message {message['message_id']} in {message['chat']['id']}")
+                    return
+            self.process_update(update)
+        finally:
+            if "album" in update:
+                for update_id in update["parts"]:
+                    self.update_log.done(update_id)
+            elif not self.albums.holds(update["update_id"]):
+                self.update_log.done(update["update_id"])
+    
+    def replay_unfinished(self):
+        """Queue updates that were received but not handled before the last shutdown"""
+        updates = self.update_log.unfinished()
+        if updates:
+            logger.info(f"Replaying {len(updates)} unfinished updates")
+        for update in updates:
+            self.dispatcher.submit(update)
+    
     def process_update(self, update: dict):
         """Process a single update"""
         try:
@@ -494,6 +648,16 @@ class TelegramBot:
                 self.handle_status_command(update)
             elif text.startswith("/groups"):
                 self.handle_groups_command(update)
+            elif text.startswith("/bots"):
+                self.handle_bots_command(update)
+            elif text.startswith("/syncbots"):
+                self.handle_syncbots_command(update)
+            elif text.startswith("/scheduled"):
+                self.handle_scheduled_command(update)
+            elif text.startswith("/schedule"):
+                self.handle_schedule_command(update)
+            elif text.startswith("/unschedule"):
+                self.handle_unschedule_command(update)
             
             # Handle group membership changes
             if "new_chat_members" in message or "left_chat_member" in message:
@@ -506,8 +670,8 @@ class TelegramBot:
         except Exception as e:
             logger.error(f"Error processing update: {e}")
     
-    def start_polling(self):
-        """Start the bot and begin polling for updates"""
+    def start(self) -> bool:
+        """Fetch bot info and notify admins that the bot is up"""
         # Get bot info
         me_response = self.get_me()
         if me_response.get("ok"):
@@ -517,11 +681,7 @@ class TelegramBot:
             logger.info(f"Admin IDs: {ADMIN_IDS}")
             
             # Send startup notification to all admins (with error handling)
-            startup_msg = f"🤖 *Bot Successfully Started!*\n\n"
-            startup_msg += f"🏷️ Username: @{bot_info['username']}\n"
-            startup_msg += f"📊 Connected Groups: {self.group_manager.get_group_count()}\n"
-            startup_msg += f"👥 Admins: {len(ADMIN_IDS)}\n\n"
-            startup_msg += f"✅ Ready for broadcasting!"
+            startup_msg = startup_text(bot_info, self.group_manager.get_group_count())
             
             for admin_id in ADMIN_IDS:
                 try:
@@ -530,49 +690,79 @@ class TelegramBot:
                         logger.warning(f"Failed to send startup message to admin {admin_id}: {result}")
                 except Exception as e:
                     logger.warning(f"Error sending startup message to admin {admin_id}: {e}")
-        else:
-            logger.error("Failed to get bot info")
-            return
+            
+            self.pool.start()
+            self.resume_broadcasts()
+            self.replay_unfinished()
+            self.scheduler.start()
+            return True
+        
+        logger.error("Failed to get bot info")
+        return False
+    
+    def start_webhook(self):
+        """Start the bot and receive updates pushed to the keep-alive server"""
+        if not self.start():
+            bot_status.failed("Bot could not start")
+            raise RuntimeError("Bot could not start")
+        
+        secret = WEBHOOK_SECRET or secrets.token_urlsafe(32)
+        set_update_handler(lambda update: self.receive_updates([update]), secret)
+        
+        result = self.make_request("setWebhook", {
+            "url": f"{WEBHOOK_URL.rstrip('/')}{WEBHOOK_PATH}",
+            "secret_token": secret,
+            "allowed_updates": ["message"]
+        })
+        if not result.get("ok"):
+            bot_status.failed("Failed to set webhook")
+            raise RuntimeError(f"Failed to set webhook: {result}")
+        
+        bot_status.serving_webhook()
+        logger.info(f"Receiving updates via webhook at {WEBHOOK_URL}{WEBHOOK_PATH}")
+        
+        # Updates are processed by the dispatcher's workers; just stay alive
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            logger.info("Bot stopped by user")
+    
+    def start_polling(self):
+        """Start the bot and begin polling for updates"""
+        if not self.start():
+            bot_status.failed("Bot could not start")
+            raise RuntimeError("Bot could not start")
+        
+        # getUpdates is refused while a webhook is registered
+        self.make_request("deleteWebhook")
         
         logger.info("Starting to poll for updates...")
+        poller = UpdatePoller(offset=self.last_update_id + 1)
         
         while True:
             try:
-                # Get updates
-                updates_response = self.get_updates(offset=self.last_update_id + 1, timeout=10)
-                
-                if not updates_response.get("ok"):
-                    error = updates_response.get("error", "unknown error")
-                    if "timeout" in error.lower():
-                        # Timeout is normal, just continue
-                        continue
-                    else:
-                        logger.error(f"Failed to get updates: {updates_response}")
-                        time.sleep(5)
-                        continue
-                
-                updates = updates_response.get("result", [])
-                
-                for update in updates:
-                    self.last_update_id = update["update_id"]
-                    self.process_update(update)
-                
-                if not updates:
-                    # No new updates, continue polling
-                    continue
+                # Hand updates to the worker pool so the next poll goes out
+                # (and acknowledges this batch) straight away; they are on
+                # disk with the new offset before that happens
+                updates = poller.poll(self.make_request)
+                self.receive_updates(updates, poller.offset)
                     
             except KeyboardInterrupt:
                 logger.info("Bot stopped by user")
                 break
             except Exception as e:
                 logger.error(f"Error in polling loop: {e}")
-                time.sleep(5)
+                time.sleep(poller.backoff.next_delay())
 
 def main():
     """Main function to start the bot"""
     try:
+        keep_alive()
         bot = TelegramBot()
-        bot.start_polling()
+        if WEBHOOK_URL:
+            bot.start_webhook()
+        else:
+            bot.start_polling()
     except KeyboardInterrupt:
         logger.info("Bot stopped by user")
     except Exception as e:
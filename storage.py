@@ -0,0 +1,202 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, Optional
+
+from config import GROUPS_FILE, GROUPS_BACKEND, DB_FILE, GROUPS_FLUSH_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+class GroupStore(ABC):
+    """Persistence backend for GroupManager"""
+
+    @abstractmethod
+    def load(self) -> Dict[str, dict]:
+        """Return every stored group keyed by str(chat_id)"""
+
+    @abstractmethod
+    def save_group(self, group: dict):
+        """Insert or update a single group record"""
+
+    @abstractmethod
+    def delete_group(self, group_id: str):
+        """Remove a single group record"""
+
+    def attach(self, snapshot: Callable[[], Dict[str, dict]]):
+        """Give the backend a way to read every current group, keyed by str(chat_id)"""
+
+    def flush(self):
+        """Write out anything still buffered"""
+
+    def close(self):
+        """Release the backend"""
+        self.flush()
+
+class JsonGroupStore(GroupStore):
+    """Keeps every group in one JSON file
+
+    Changes only mark the store dirty; the file is rewritten at most once
+    every flush_interval seconds (or on an explicit flush()), atomically via
+    a temp file, fsync and rename, so a crash never leaves a half-written file.
+    The groups themselves are read from the attached snapshot at flush time
+    rather than mirrored here, so they are held in memory only once.
+    """
+
+    def __init__(self, path: str = GROUPS_FILE, flush_interval: float = GROUPS_FLUSH_INTERVAL):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.snapshot: Optional[Callable[[], Dict[str, dict]]] = None
+        self.lock = threading.Lock()
+        self.write_lock = threading.Lock()
+        self.dirty = False
+        self.timer = None
+
+    def load(self) -> Dict[str, dict]:
+        """Load groups from JSON file"""
+        try:
+            with open(self.path, 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            logger.info("Groups file not found, creating new one")
+        except json.JSONDecodeError:
+            logger.error("Invalid JSON in groups file, starting fresh")
+        return {}
+
+    def attach(self, snapshot: Callable[[], Dict[str, dict]]):
+        self.snapshot = snapshot
+
+    def save_group(self, group: dict):
+        with self.lock:
+            self.mark_dirty()
+
+    def delete_group(self, group_id: str):
+        with self.lock:
+            self.mark_dirty()
+
+    def mark_dirty(self):
+        """Record a pending change and schedule a flush (call with lock held)"""
+        self.dirty = True
+        if self.timer is None:
+            self.timer = threading.Timer(self.flush_interval, self.flush)
+            self.timer.daemon = True
+            self.timer.start()
+
+    def flush(self):
+        """Save groups to JSON file if anything changed"""
+        # write_lock keeps concurrent flushes in order. The snapshot is taken
+        # outside self.lock: GroupManager holds its own lock while calling
+        # save_group, so taking them in the other order could deadlock.
+        # Changes made after the dirty flag is cleared just mark it again.
+        with self.write_lock:
+            with self.lock:
+                if self.timer is not None:
+                    self.timer.cancel()
+                    self.timer = None
+                if not self.dirty or self.snapshot is None:
+                    return
+                self.dirty = False
+            groups = self.snapshot()
+            data = json.dumps(groups, indent=2)
+            count = len(groups)
+
+            tmp_path = f"{self.path}.tmp"
+            try:
+                with open(tmp_path, 'w') as f:
+                    f.write(data)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self.path)
+                logger.info(f"Saved {count} groups to file")
+            except Exception as e:
+                logger.error(f"Error saving groups: {e}")
+                with self.lock:
+                    self.mark_dirty()
+
+class SqliteGroupStore(GroupStore):
+    """Stores one row per group in SQLite (WAL mode), so each change is a single-row write"""
+
+    def __init__(self, path: str = DB_FILE, migrate_from: str = GROUPS_FILE):
+        self.path = path
+        self.migrate_from = migrate_from
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS groups ("
+            " id INTEGER PRIMARY KEY,"
+            " title TEXT NOT NULL,"
+            " type TEXT NOT NULL,"
+            " active INTEGER NOT NULL DEFAULT 1,"
+            " added_date TEXT,"
+            " bot_id INTEGER)"
+        )
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(groups)")}
+        if "bot_id" not in columns:
+            self.conn.execute("ALTER TABLE groups ADD COLUMN bot_id INTEGER")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+
+    def migrate(self):
+        """Import groups.json once, the first time the database is used"""
+        done = self.conn.execute("SELECT value FROM meta WHERE key = 'json_migrated'").fetchone()
+        if done or not self.migrate_from or not os.path.exists(self.migrate_from):
+            return
+
+        groups = JsonGroupStore(self.migrate_from).load()
+        with self.lock:
+            self.conn.execute("BEGIN")
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO groups (id, title, type, active, added_date) VALUES (?, ?, ?, ?, ?)",
+                [
+                    (g['id'], g.get('title', 'Unknown Group'), g.get('type', 'group'),
+                     int(g.get('active', True)), g.get('added_date'))
+                    for g in groups.values()
+                ]
+            )
+            self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('json_migrated', ?)", (self.migrate_from,))
+            self.conn.execute("COMMIT")
+        logger.info(f"Migrated {len(groups)} groups from {self.migrate_from} to {self.path}")
+
+    def load(self) -> Dict[str, dict]:
+        self.migrate()
+        rows = self.conn.execute("SELECT id, title, type, active, added_date, bot_id FROM groups").fetchall()
+        return {
+            str(chat_id): {
+                'id': chat_id,
+                'title': title,
+                'type': chat_type,
+                'active': bool(active),
+                'added_date': added_date,
+                'bot_id': bot_id
+            }
+            for chat_id, title, chat_type, active, added_date, bot_id in rows
+        }
+
+    def save_group(self, group: dict):
+        with self.lock:
+            self.conn.execute(
+                "INSERT INTO groups (id, title, type, active, added_date, bot_id) VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET title = excluded.title, type = excluded.type, "
+                "active = excluded.active, added_date = excluded.added_date, bot_id = excluded.bot_id",
+                (group['id'], group['title'], group['type'], int(group.get('active', True)),
+                 group.get('added_date'), group.get('bot_id'))
+            )
+
+    def delete_group(self, group_id: str):
+        with self.lock:
+            self.conn.execute("DELETE FROM groups WHERE id = ?", (int(group_id),))
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+def create_group_store(backend: str = GROUPS_BACKEND) -> GroupStore:
+    """Create the configured group storage backend"""
+    if backend == "json":
+        return JsonGroupStore()
+    if backend == "sqlite":
+        return SqliteGroupStore()
+    raise ValueError(f"Unknown groups backend: {backend}")
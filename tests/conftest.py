@@ -0,0 +1,10 @@
+import os
+import sys
+import tempfile
+
+# config reads these at import time; keep the tests off the real bot and database
+os.environ.setdefault("BOT_TOKEN", "123:TEST")
+os.environ.setdefault("ADMIN_ID", "424242")
+os.environ.setdefault("DB_FILE", os.path.join(tempfile.mkdtemp(prefix="drct-tests-"), "test.db"))
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
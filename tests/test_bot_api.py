@@ -0,0 +1,80 @@
+import asyncio
+
+import httpx
+import pytest
+
+import rate_limit
+from async_news_bot import AsyncTelegramBot
+from bot_api import BotApiClient
+from rate_limit import RateLimiter
+
+FLOOD = {"ok": False, "error_code": 429, "description": "Too Many Requests", "parameters": {"retry_after": 30}}
+
+class FakeResponse:
+    def __init__(self, result: dict):
+        self.result = result
+
+    def json(self) -> dict:
+        return self.result
+
+class FakeSession:
+    """Answers each post with the next canned result"""
+
+    def __init__(self, *results: dict):
+        self.results = list(results)
+        self.posts = 0
+
+    def post(self, url, timeout=None, **payload):
+        self.posts += 1
+        return FakeResponse(self.results.pop(0))
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(rate_limit.time, "monotonic", lambda: now[0])
+    monkeypatch.setattr(rate_limit.time, "sleep", lambda seconds: now.__setitem__(0, now[0] + seconds))
+    return now
+
+def client(*results: dict) -> BotApiClient:
+    api = BotApiClient(base_url="http://bot.invalid/bot1:A", limiter=RateLimiter(global_rate=1000))
+    api.session = FakeSession(*results)
+    return api
+
+def test_flood_limit_is_retried_after_the_pause(clock):
+    api = client(FLOOD, {"ok": True, "result": {}})
+    assert api.make_request("sendMessage", {"chat_id": -1}, retries=1) == {"ok": True, "result": {}}
+    assert api.session.posts == 2
+    assert clock[0] == pytest.approx(1030.0)
+
+def test_last_flood_limit_still_pauses_the_limiter(clock):
+    api = client(FLOOD, FLOOD)
+    assert api.make_request("sendMessage", {"chat_id": -1}, retries=1) == FLOOD
+    assert api.session.posts == 2
+    # Whatever the caller does next (requeue, another target) waits out retry_after
+    assert api.limiter.reserve(-2) == pytest.approx(30.0)
+
+def test_flood_limit_pauses_even_without_retries(clock):
+    api = client(FLOOD)
+    assert api.make_request("sendMessage", {"chat_id": -1}, retries=0) == FLOOD
+    assert api.session.posts == 1
+    assert api.limiter.reserve(-2) == pytest.approx(30.0)
+
+def test_async_bot_shares_the_flood_handling(clock, monkeypatch):
+    # The async bot paces sends with the process-wide limiter
+    limiter = RateLimiter(global_rate=1000)
+    monkeypatch.setattr("async_news_bot.rate_limiter", limiter)
+    posts = []
+
+    def answer(request):
+        posts.append(request)
+        return httpx.Response(200, json=FLOOD)
+
+    async def send():
+        bot = AsyncTelegramBot()
+        async with httpx.AsyncClient(transport=httpx.MockTransport(answer)) as client:
+            bot.client = client
+            return await bot.make_request("sendMessage", {"chat_id": -1}, retries=0)
+
+    assert asyncio.run(send()) == FLOOD
+    assert len(posts) == 1
+    assert limiter.reserve(-2) == pytest.approx(30.0)
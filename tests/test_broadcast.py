@@ -0,0 +1,134 @@
+import asyncio
+import json
+
+import pytest
+
+from broadcast import SIGNATURE, PreparedBroadcast, fan_out_async, prepare_album, prepare_broadcast, with_signature
+
+ADMIN_CHAT = {"id": 424242, "type": "private"}
+
+def test_body_for_splices_chat_id_onto_the_encoded_params():
+    params = {"text": "Hello", "entities": [{"type": "bold", "offset": 0, "length": 5}]}
+    prepared = PreparedBroadcast("sendMessage", params)
+    body = prepared.body_for(-1001234567890)
+    assert body.startswith(b'{"chat_id":-1001234567890,')
+    assert json.loads(body) == {"chat_id": -1001234567890, **params}
+    # The same tail is reused for every target
+    assert json.loads(prepared.body_for(-42)) == {"chat_id": -42, **params}
+
+def test_body_for_keeps_non_ascii_text_as_utf8():
+    prepared = PreparedBroadcast("sendMessage", {"text": "खबर — news"})
+    body = prepared.body_for(-5)
+    assert "खबर".encode("utf-8") in body
+    assert json.loads(body.decode("utf-8"))["text"] == "खबर — news"
+
+def test_body_for_with_no_params():
+    assert json.loads(PreparedBroadcast("copyMessage", {}).body_for(-5)) == {"chat_id": -5}
+
+def test_cost_counts_album_items():
+    assert PreparedBroadcast("sendMessage", {"text": "x"}).cost == 1
+    media = [{"type": "photo", "media": f"file{i}"} for i in range(4)]
+    assert PreparedBroadcast("sendMediaGroup", {"media": media}).cost == 4
+    assert PreparedBroadcast("copyMessages", {"from_chat_id": 1, "message_ids": [1, 2, 3]}).cost == 3
+
+def test_text_is_resent_with_the_signature():
+    message = {"message_id": 2, "chat": ADMIN_CHAT, "text": "Market update",
+               "entities": [{"type": "bold", "offset": 0, "length": 6}]}
+    method, params = prepare_broadcast(message)
+    assert method == "sendMessage"
+    assert params == {"text": with_signature("Market update"), "entities": message["entities"]}
+
+def test_long_text_is_truncated_and_loses_its_entities():
+    message = {"message_id": 2, "chat": ADMIN_CHAT, "text": "x" * 5000,
+               "entities": [{"type": "bold", "offset": 0, "length": 6}]}
+    _, params = prepare_broadcast(message)
+    assert len(params["text"]) == 4096
+    assert "entities" not in params
+
+def test_media_is_copied_with_a_signed_caption():
+    message = {"message_id": 7, "chat": ADMIN_CHAT, "photo": [{"file_id": "small"}, {"file_id": "large"}],
+               "caption": "Photo of the day"}
+    method, params = prepare_broadcast(message)
+    assert method == "copyMessage"
+    assert params == {"from_chat_id": 424242, "message_id": 7, "caption": with_signature("Photo of the day")}
+
+def test_other_messages_are_copied_as_is():
+    message = {"message_id": 8, "chat": ADMIN_CHAT, "sticker": {"file_id": "s"}}
+    assert prepare_broadcast(message) == ("copyMessage", {"from_chat_id": 424242, "message_id": 8})
+
+def test_album_signs_the_captioned_item():
+    messages = [
+        {"message_id": 10, "chat": ADMIN_CHAT, "photo": [{"file_id": "a1"}, {"file_id": "a2"}]},
+        {"message_id": 11, "chat": ADMIN_CHAT, "video": {"file_id": "v"}, "caption": "Flood pictures"},
+    ]
+    method, params = prepare_album(messages)
+    assert method == "sendMediaGroup"
+    assert params["media"] == [
+        {"type": "photo", "media": "a2"},
+        {"type": "video", "media": "v", "caption": with_signature("Flood pictures")},
+    ]
+
+def test_uncaptioned_album_signs_the_first_item():
+    messages = [
+        {"message_id": 10, "chat": ADMIN_CHAT, "document": {"file_id": "d1"}},
+        {"message_id": 11, "chat": ADMIN_CHAT, "document": {"file_id": "d2"}},
+    ]
+    prepared = PreparedBroadcast.from_album(messages)
+    assert prepared.params["media"][0]["caption"] == SIGNATURE
+    assert "caption" not in prepared.params["media"][1]
+    assert prepared.cost == 2
+
+async def collect(targets, send, concurrency=4, max_requeues=0):
+    return [item async for item in fan_out_async(targets, send, concurrency, max_requeues)]
+
+def test_fan_out_async_keeps_a_fixed_number_of_tasks():
+    in_flight, peak_sends, peak_tasks = 0, 0, 0
+
+    async def send(chat_id):
+        nonlocal in_flight, peak_sends, peak_tasks
+        in_flight += 1
+        peak_sends = max(peak_sends, in_flight)
+        peak_tasks = max(peak_tasks, len(asyncio.all_tasks()))
+        await asyncio.sleep(0)
+        in_flight -= 1
+        return {"ok": True}
+
+    results = asyncio.run(collect(range(-1, -1001, -1), send))
+    assert sorted(chat_id for chat_id, _ in results) == list(range(-1000, 0))
+    assert peak_sends == 4
+    # The workers plus the main task, not one task per target
+    assert peak_tasks == 5
+
+def test_fan_out_async_yields_exceptions_as_results():
+    async def send(chat_id):
+        if chat_id == -2:
+            raise RuntimeError("blocked")
+        return {"ok": True}
+
+    results = dict(asyncio.run(collect([-1, -2, -3], send)))
+    assert isinstance(results.pop(-2), RuntimeError)
+    assert results == {-1: {"ok": True}, -3: {"ok": True}}
+
+def test_fan_out_async_requeues_flood_limited_sends():
+    calls = []
+
+    async def send(chat_id):
+        calls.append(chat_id)
+        if calls.count(chat_id) == 1 and chat_id == -1:
+            return {"ok": False, "error_code": 429, "parameters": {"retry_after": 1}}
+        return {"ok": True}
+
+    results = asyncio.run(collect([-1, -2, -3], send, concurrency=1, max_requeues=1))
+    assert results == [(-2, {"ok": True}), (-3, {"ok": True}), (-1, {"ok": True})]
+    assert calls == [-1, -2, -3, -1]
+
+def test_fan_out_async_raises_when_the_targets_fail():
+    def targets():
+        yield -1
+        raise ValueError("database gone")
+
+    async def send(chat_id):
+        return {"ok": True}
+
+    with pytest.raises(ValueError, match="database gone"):
+        asyncio.run(collect(targets(), send))
@@ -0,0 +1,86 @@
+import threading
+
+import pytest
+
+from broadcast import PreparedBroadcast
+from broadcast_queue import ROUTINE, URGENT, BroadcastLanes, lane_for
+from jobs import BroadcastJob
+
+HASHTAGS = ["#breaking", "#urgent"]
+
+def job(job_id: int, text: str = "News") -> BroadcastJob:
+    return BroadcastJob(job_id, 424242, PreparedBroadcast("sendMessage", {"text": text}), None)
+
+@pytest.mark.parametrize("params, lane", [
+    ({"text": "#Breaking: bridge closed"}, URGENT),
+    ({"text": "Update #urgent"}, URGENT),
+    ({"text": "Market roundup"}, ROUTINE),
+    ({"text": "#breakingnews roundup"}, ROUTINE),
+    ({"from_chat_id": 1, "message_id": 2, "caption": "Photo #BREAKING"}, URGENT),
+    ({"from_chat_id": 1, "message_id": 2}, ROUTINE),
+    ({"media": [{"type": "photo", "media": "a"}, {"type": "photo", "media": "b", "caption": "#urgent"}]}, URGENT),
+])
+def test_lane_for(params, lane):
+    assert lane_for(PreparedBroadcast("sendMessage", params), HASHTAGS) == lane
+
+def test_jobs_in_a_lane_run_in_order():
+    ran = []
+    lanes = BroadcastLanes(lambda job, lane: ran.append((job.id, lane)))
+    for job_id in range(5):
+        lanes.submit(job(job_id), ROUTINE)
+    lanes.wait_idle()
+    assert ran == [(job_id, ROUTINE) for job_id in range(5)]
+    assert lanes.pending() == 0
+
+def test_submit_picks_the_lane_from_the_message():
+    lanes = BroadcastLanes(lambda job, lane: None)
+    assert lanes.submit(job(1, "#breaking: storm warning")) == URGENT
+    assert lanes.submit(job(2, "Weather for the week")) == ROUTINE
+    lanes.wait_idle()
+
+def test_a_failing_job_does_not_stop_its_lane():
+    ran = []
+
+    def run(job, lane):
+        if job.id == 1:
+            raise RuntimeError("boom")
+        ran.append(job.id)
+
+    lanes = BroadcastLanes(run)
+    lanes.submit(job(1), ROUTINE)
+    lanes.submit(job(2), ROUTINE)
+    lanes.wait_idle()
+    assert ran == [2]
+
+def test_urgent_job_preempts_a_running_routine_job():
+    sent = []
+    routine_started, release = threading.Event(), threading.Event()
+
+    def run(job, lane):
+        targets = [(job.id, n) for n in range(5)]
+        for target in lanes.gated(lane, targets):
+            sent.append(target)
+            if target == (1, 0):
+                routine_started.set()
+                release.wait(5)
+
+    lanes = BroadcastLanes(run)
+    lanes.submit(job(1), ROUTINE)
+    assert routine_started.wait(5)
+    lanes.submit(job(2), URGENT)
+    release.set()
+    lanes.wait_idle()
+
+    # The routine job is held after its in-flight send until the urgent one is done
+    assert sent == [(1, 0)] + [(2, n) for n in range(5)] + [(1, n) for n in range(1, 5)]
+
+def test_urgent_lane_is_never_held_back():
+    lanes = BroadcastLanes(lambda job, lane: None)
+    with lanes.changed:
+        lanes.busy[ROUTINE] += 1
+        assert not lanes.outranked(URGENT)
+        lanes.busy[URGENT] += 1
+        assert lanes.outranked(ROUTINE)
+        lanes.busy[ROUTINE] -= 1
+        lanes.busy[URGENT] -= 1
+    assert list(lanes.gated(URGENT, [1, 2, 3])) == [1, 2, 3]
@@ -0,0 +1,115 @@
+import pytest
+
+from broadcast import PreparedBroadcast
+from jobs import FAILED, SENT, BroadcastRun, JobStore
+from metrics import bot_status
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "jobs.db")
+
+def make_job(store: JobStore, targets=(-1, -2, -3, -4)):
+    prepared = PreparedBroadcast("sendMessage", {"text": "Hello"})
+    return store.create_job(424242, prepared, targets)
+
+def test_new_job_has_every_target_pending(db_path):
+    store = JobStore(db_path)
+    job = make_job(store, [-1, -2, -2, -3])
+    assert sorted(store.pending_targets(job.id)) == [-3, -2, -1]
+    assert store.counts(job.id) == (0, 0, 3)
+
+def test_mark_records_each_outcome(db_path):
+    store = JobStore(db_path)
+    job = make_job(store)
+    store.mark(job.id, -1, SENT)
+    store.mark(job.id, -2, FAILED)
+    assert store.counts(job.id) == (1, 1, 2)
+    assert sorted(store.pending_targets(job.id)) == [-4, -3]
+
+def test_interrupted_job_resumes_with_undelivered_targets(db_path):
+    store = JobStore(db_path)
+    job = make_job(store)
+    store.set_status_message(job, 99)
+    store.mark(job.id, -1, SENT)
+    store.mark(job.id, -3, FAILED)
+
+    # A fresh store on the same file is what the bot sees after a restart
+    resumed, = JobStore(db_path).unfinished_jobs()
+    assert resumed.id == job.id
+    assert resumed.admin_chat_id == 424242
+    assert resumed.status_message_id == 99
+    assert resumed.prepared.method == "sendMessage"
+    assert resumed.prepared.body_for(-2) == job.prepared.body_for(-2)
+    assert sorted(JobStore(db_path).pending_targets(job.id)) == [-4, -2]
+
+def test_finished_jobs_are_not_resumed(db_path):
+    store = JobStore(db_path)
+    done, running = make_job(store), make_job(store)
+    store.finish_job(done.id)
+    assert [job.id for job in store.unfinished_jobs()] == [running.id]
+
+def test_unfinished_jobs_come_oldest_first(db_path):
+    store = JobStore(db_path)
+    ids = [make_job(store).id for _ in range(3)]
+    assert [job.id for job in store.unfinished_jobs()] == ids
+
+def test_prune_drops_only_old_finished_jobs(db_path):
+    store = JobStore(db_path)
+    old, running = make_job(store), make_job(store)
+    store.finish_job(old.id)
+    store.prune(max_age=3600)
+    assert store.counts(old.id) == (0, 0, 4)
+
+    store.prune(max_age=-1)
+    assert store.counts(old.id) == (0, 0, 0)
+    assert store.counts(running.id) == (0, 0, 4)
+
+class FakeGroups:
+    def __init__(self):
+        self.deactivated = []
+        self.flushes = 0
+
+    def deactivate_group(self, chat_id: int):
+        self.deactivated.append(chat_id)
+
+    def flush(self):
+        self.flushes += 1
+
+def test_run_records_results_and_deactivates_unreachable_groups(db_path):
+    store, groups = JobStore(db_path), FakeGroups()
+    job = make_job(store)
+    with BroadcastRun(store, job, groups) as run:
+        assert sorted(run.targets) == [-4, -3, -2, -1]
+        assert run.progress in bot_status.broadcasts
+        run.record_result(-1, {"ok": True, "result": {}})
+        run.record_result(-2, {"ok": False, "error_code": 403, "description": "Forbidden: bot was blocked by the user"})
+        run.record_result(-3, {"ok": False, "error_code": 400, "description": "Bad Request: message is too long"})
+        run.record(-4, False, RuntimeError("forbidden"), gone=True)
+        assert (run.progress.sent, run.progress.failed) == (1, 3)
+        assert run.finish() == (1, 3)
+    assert run.progress not in bot_status.broadcasts
+    assert groups.deactivated == [-2, -4]
+    assert groups.flushes == 1
+    assert store.unfinished_jobs() == []
+
+def test_resumed_run_counts_earlier_deliveries(db_path):
+    store = JobStore(db_path)
+    job = make_job(store)
+    store.mark(job.id, -1, SENT)
+    store.mark(job.id, -2, FAILED)
+    with BroadcastRun(store, job, FakeGroups()) as run:
+        assert sorted(run.targets) == [-4, -3]
+        assert (run.progress.total, run.progress.remaining) == (4, 2)
+        for chat_id in run.targets:
+            run.record(chat_id, True)
+        assert run.finish() == (3, 1)
+
+def test_failed_run_leaves_the_job_resumable(db_path):
+    store = JobStore(db_path)
+    job = make_job(store)
+    with pytest.raises(RuntimeError):
+        with BroadcastRun(store, job, FakeGroups()) as run:
+            run.record(-1, True)
+            raise RuntimeError("worker died")
+    assert run.progress not in bot_status.broadcasts
+    assert [unfinished.id for unfinished in store.unfinished_jobs()] == [job.id]
@@ -0,0 +1,104 @@
+import pytest
+
+import rate_limit
+from rate_limit import RateLimiter, SharedBudget, TokenBucket, is_flood_limited
+
+class FakeClock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limit.time, "monotonic", clock)
+    return clock
+
+def test_bucket_allows_burst_then_queues_reservations():
+    bucket = TokenBucket(rate=10, capacity=10)
+    now = bucket.updated
+    assert [bucket.reserve(now) for _ in range(10)] == [0.0] * 10
+    # Each reservation past the budget waits behind the previous one
+    assert bucket.reserve(now) == pytest.approx(0.1)
+    assert bucket.reserve(now) == pytest.approx(0.2)
+
+def test_bucket_refills_up_to_capacity():
+    bucket = TokenBucket(rate=10, capacity=5)
+    now = bucket.updated
+    for _ in range(5):
+        bucket.reserve(now)
+    assert bucket.reserve(now + 0.15) == 0.0
+    bucket.refill(now + 60)
+    assert bucket.tokens == 5
+
+def test_bucket_cost_takes_several_tokens():
+    bucket = TokenBucket(rate=10, capacity=10)
+    now = bucket.updated
+    assert bucket.reserve(now, cost=10) == 0.0
+    assert bucket.reserve(now, cost=5) == pytest.approx(0.5)
+
+def test_limiter_paces_global_sends(clock):
+    limiter = RateLimiter(global_rate=30, chat_rate=1000, group_rate_per_minute=60000, burst=1000)
+    delays = [limiter.reserve() for _ in range(60)]
+    assert delays[:30] == [0.0] * 30
+    assert delays[-1] == pytest.approx(1.0)
+    clock.now += 1.0
+    assert limiter.reserve() == pytest.approx(1 / 30)
+
+def test_limiter_uses_group_and_private_chat_rates(clock):
+    limiter = RateLimiter(global_rate=1000, chat_rate=1, group_rate_per_minute=20, burst=1)
+    assert limiter.reserve(-100) == 0.0
+    assert limiter.reserve(-100) == pytest.approx(3.0)  # 20 per minute
+    assert limiter.reserve(7) == 0.0
+    assert limiter.reserve(7) == pytest.approx(1.0)
+    # Other chats have their own budget
+    assert limiter.reserve(-200) == 0.0
+
+def test_limiter_counts_album_items(clock):
+    limiter = RateLimiter(global_rate=10, chat_rate=1000, group_rate_per_minute=60000, burst=1000)
+    assert limiter.reserve(-100, cost=10) == 0.0
+    assert limiter.reserve(-100, cost=10) == pytest.approx(1.0)
+
+def test_pause_holds_back_every_send(clock):
+    limiter = RateLimiter(global_rate=1000, chat_rate=1000, group_rate_per_minute=60000, burst=1000)
+    limiter.pause(5)
+    assert limiter.reserve(-100) == pytest.approx(5.0)
+    # A shorter pause never cuts an existing one short
+    limiter.pause(1)
+    assert limiter.reserve() == pytest.approx(5.0)
+    clock.now += 5
+    assert limiter.reserve() == 0.0
+
+def test_wait_sleeps_for_the_reserved_delay(clock, monkeypatch):
+    slept = []
+    monkeypatch.setattr(rate_limit.time, "sleep", slept.append)
+    limiter = RateLimiter(global_rate=1, chat_rate=1000, group_rate_per_minute=60000, burst=1000)
+    assert limiter.wait() == 0.0
+    assert limiter.wait() == pytest.approx(1.0)
+    assert slept == [pytest.approx(1.0)]
+
+def test_shared_budget_is_drawn_by_every_limiter(clock):
+    budget = SharedBudget(rate=10, capacity=10)
+    first, second = RateLimiter(global_rate=1000), RateLimiter(global_rate=1000)
+    first.use_shared_budget(budget)
+    second.use_shared_budget(budget)
+    for _ in range(5):
+        assert first.reserve() == 0.0
+        assert second.reserve() == 0.0
+    assert first.reserve() == pytest.approx(0.1)
+    assert second.reserve() == pytest.approx(0.2)
+
+def test_shared_budget_pause_reaches_every_limiter(clock):
+    budget = SharedBudget(rate=1000)
+    first, second = RateLimiter(), RateLimiter()
+    first.use_shared_budget(budget)
+    second.use_shared_budget(budget)
+    first.pause(3)
+    assert second.reserve() == pytest.approx(3.0)
+
+def test_is_flood_limited():
+    assert is_flood_limited({"ok": False, "error_code": 429, "parameters": {"retry_after": 3}})
+    assert not is_flood_limited({"ok": False, "error_code": 403})
+    assert not is_flood_limited({"ok": True, "result": {}})
@@ -0,0 +1,104 @@
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+import pytest
+
+import scheduler as scheduler_module
+from broadcast import PreparedBroadcast
+from scheduler import BroadcastScheduler, format_interval, parse_duration, parse_schedule
+
+UTC = "UTC"
+# Monday 26 January 2026, 12:00 UTC
+NOW = datetime(2026, 1, 26, 12, 0, tzinfo=ZoneInfo(UTC)).timestamp()
+
+def at(*args, timezone: str = UTC) -> float:
+    return datetime(*args, tzinfo=ZoneInfo(timezone)).timestamp()
+
+@pytest.mark.parametrize("text, seconds", [
+    ("90s", 90), ("30m", 1800), ("2h", 7200), ("1d", 86400), ("1w", 604800), ("1h30m", 5400), ("2H", 7200),
+])
+def test_parse_duration(text, seconds):
+    assert parse_duration(text) == seconds
+
+@pytest.mark.parametrize("text", ["", "30", "m", "1.5h", "30 m", "1y"])
+def test_parse_duration_rejects_other_text(text):
+    assert parse_duration(text) is None
+
+def test_delay():
+    assert parse_schedule(["30m"], NOW, UTC) == (NOW + 1800, None)
+    assert parse_schedule(["1h30m"], NOW, UTC) == (NOW + 5400, None)
+
+def test_clock_time_later_today():
+    assert parse_schedule(["18:30"], NOW, UTC) == (at(2026, 1, 26, 18, 30), None)
+
+def test_clock_time_already_passed_means_tomorrow():
+    assert parse_schedule(["09:00"], NOW, UTC) == (at(2026, 1, 27, 9, 0), None)
+    assert parse_schedule(["12:00"], NOW, UTC) == (at(2026, 1, 27, 12, 0), None)
+
+def test_clock_time_is_read_in_the_schedule_timezone():
+    # 12:00 UTC is 17:30 in India
+    due, _ = parse_schedule(["18:30"], NOW, "Asia/Kolkata")
+    assert due == at(2026, 1, 26, 18, 30, timezone="Asia/Kolkata")
+    assert due == NOW + 3600
+
+def test_date_and_time():
+    assert parse_schedule(["2026-02-01", "09:00"], NOW, UTC) == (at(2026, 2, 1, 9, 0), None)
+    assert parse_schedule(["01-02-2026", "09:00"], NOW, UTC) == (at(2026, 2, 1, 9, 0), None)
+
+def test_repeating_schedules():
+    assert parse_schedule(["18:30", "daily"], NOW, UTC) == (at(2026, 1, 26, 18, 30), 86400)
+    assert parse_schedule(["2h", "every", "6h"], NOW, UTC) == (NOW + 7200, 6 * 3600)
+    assert parse_schedule(["09:00", "Weekly"], NOW, UTC) == (at(2026, 1, 27, 9, 0), 7 * 86400)
+
+def test_repeat_without_a_time_starts_one_interval_from_now():
+    assert parse_schedule(["every", "6h"], NOW, UTC) == (NOW + 6 * 3600, 6 * 3600)
+    assert parse_schedule(["hourly"], NOW, UTC) == (NOW + 3600, 3600)
+
+@pytest.mark.parametrize("args, error", [
+    ([], "Unknown time"),
+    (["soon"], "Unknown time"),
+    (["25:00"], "Unknown time"),
+    (["every", "often"], "Unknown interval"),
+    (["every", "30s"], "at least a minute"),
+    (["2026-01-01", "09:00"], "already passed"),
+])
+def test_invalid_schedules(args, error):
+    with pytest.raises(ValueError, match=error):
+        parse_schedule(args, NOW, UTC)
+
+@pytest.mark.parametrize("seconds, text", [(3600, "1h"), (86400, "1d"), (604800, "1w"), (5400, "90m"), (90, "90s")])
+def test_format_interval(seconds, text):
+    assert format_interval(seconds) == text
+
+def test_scheduled_broadcasts_survive_a_restart(tmp_path):
+    path = str(tmp_path / "schedule.db")
+    scheduler = BroadcastScheduler(lambda entry: None, path)
+    prepared = PreparedBroadcast("sendMessage", {"text": "Evening bulletin"})
+    later = scheduler.add(424242, prepared, NOW + 7200, 86400)
+    sooner = scheduler.add(424242, prepared, NOW + 3600)
+    cancelled = scheduler.add(424242, prepared, NOW + 60)
+    assert scheduler.cancel(cancelled.id)
+    assert not scheduler.cancel(cancelled.id)
+
+    reloaded = BroadcastScheduler(lambda entry: None, path).upcoming()
+    assert [(entry.id, entry.due, entry.interval) for entry in reloaded] == [
+        (sooner.id, NOW + 3600, None), (later.id, NOW + 7200, 86400)
+    ]
+    assert reloaded[0].prepared.body_for(-1) == prepared.body_for(-1)
+
+def test_missed_recurring_slots_fire_once(tmp_path, monkeypatch):
+    monkeypatch.setattr(scheduler_module.time, "time", lambda: NOW)
+    path = str(tmp_path / "schedule.db")
+    scheduler = BroadcastScheduler(lambda entry: None, path)
+    prepared = PreparedBroadcast("sendMessage", {"text": "Hourly headlines"})
+    entry = scheduler.add(424242, prepared, NOW - 3.5 * 3600, 3600)
+    once = scheduler.add(424242, prepared, NOW - 60)
+
+    with scheduler.wakeup:
+        fired = [scheduler.next_due(), scheduler.next_due()]
+    assert [(e.id, e.due) for e in fired] == [(entry.id, NOW - 3.5 * 3600), (once.id, NOW - 60)]
+
+    # The recurring entry moves on to its next future slot; the one-off is gone
+    upcoming, = BroadcastScheduler(lambda entry: None, path).upcoming()
+    assert upcoming.id == entry.id
+    assert upcoming.due == NOW + 0.5 * 3600
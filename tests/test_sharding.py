@@ -0,0 +1,64 @@
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+import sharding
+from broadcast import PreparedBroadcast
+from sharding import ShardedBroadcaster
+
+PREPARED = PreparedBroadcast("sendMessage", {"text": "Hello"})
+
+class FakePool:
+    """Executor that settles each shard as soon as it is submitted"""
+
+    def __init__(self, fail_on: int = None, error: Exception = None):
+        self.fail_on = fail_on
+        self.error = error
+        self.shards = []
+        self.stopped = False
+
+    def submit(self, fn, shard):
+        _, _, targets = shard
+        self.shards.append(targets)
+        future = Future()
+        if self.fail_on in targets:
+            future.set_exception(self.error)
+        else:
+            future.set_result(([(chat_id, {"ok": True}) for chat_id in targets], {}))
+        return future
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        self.stopped = True
+
+@pytest.fixture
+def broadcaster(monkeypatch):
+    # The constructor points the process-wide limiter at its shared budget
+    monkeypatch.setattr(sharding.rate_limiter, "shared", sharding.rate_limiter.shared)
+    return ShardedBroadcaster(processes=2, shard_size=2)
+
+def test_every_target_is_sent_in_shards(broadcaster):
+    broadcaster.pool = FakePool()
+    results = list(broadcaster.fan_out(range(-1, -8, -1), PREPARED))
+    assert sorted(chat_id for chat_id, _ in results) == list(range(-7, 0))
+    assert sorted(map(len, broadcaster.pool.shards)) == [1, 2, 2, 2]
+
+def test_failed_shard_still_yields_the_shards_in_flight(broadcaster):
+    pool = broadcaster.pool = FakePool(fail_on=-3, error=RuntimeError("boom"))
+    targets = iter(range(-1, -11, -1))
+    results = []
+    with pytest.raises(RuntimeError, match="boom"):
+        for chat_id, result in broadcaster.fan_out(targets, PREPARED):
+            results.append(chat_id)
+    # The other shard in flight is reported; nothing more is handed out
+    assert sorted(results) == [-2, -1]
+    assert pool.shards == [[-1, -2], [-3, -4]]
+    assert next(targets) == -5
+    assert broadcaster.pool is pool
+
+def test_dead_worker_replaces_the_pool(broadcaster):
+    pool = broadcaster.pool = FakePool(fail_on=-1, error=BrokenProcessPool("worker died"))
+    with pytest.raises(BrokenProcessPool):
+        list(broadcaster.fan_out(range(-1, -5, -1), PREPARED))
+    assert pool.stopped
+    assert broadcaster.pool is None
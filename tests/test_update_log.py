@@ -0,0 +1,71 @@
+import itertools
+
+import pytest
+
+import update_log
+from update_log import UpdateLog
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "updates.db")
+
+def update(update_id: int) -> dict:
+    return {"update_id": update_id, "message": {"message_id": update_id, "chat": {"id": 424242}, "text": "hi"}}
+
+def test_offset_is_persisted_with_the_fetched_updates(db_path):
+    log = UpdateLog(db_path)
+    assert log.offset == 0
+    log.record_fetched([update(10), update(11)], offset=12)
+    assert UpdateLog(db_path).offset == 12
+
+def test_empty_fetch_leaves_the_offset_alone(db_path):
+    log = UpdateLog(db_path)
+    log.record_fetched([update(10)], offset=11)
+    log.record_fetched([], offset=50)
+    assert log.offset == 11
+
+def test_unhandled_updates_are_replayed_in_order(db_path):
+    log = UpdateLog(db_path)
+    log.record_fetched([update(12), update(10), update(11)], offset=13)
+    log.done(11)
+    assert [u["update_id"] for u in UpdateLog(db_path).unfinished()] == [10, 12]
+    assert UpdateLog(db_path).unfinished()[0] == update(10)
+
+def test_refetched_updates_are_stored_once(db_path):
+    log = UpdateLog(db_path)
+    log.record_fetched([update(10)], offset=11)
+    log.record_fetched([update(10), update(11)], offset=12)
+    assert [u["update_id"] for u in log.unfinished()] == [10, 11]
+
+def test_claim_dedupes_a_message(db_path):
+    log = UpdateLog(db_path)
+    assert log.claim(424242, 5)
+    assert not log.claim(424242, 5)
+    assert log.claim(424242, 6)
+    assert log.claim(111, 5)
+
+def test_claims_survive_a_restart(db_path):
+    UpdateLog(db_path).claim(424242, 5)
+    assert not UpdateLog(db_path).claim(424242, 5)
+
+def test_claims_expire_after_the_ttl(db_path):
+    log = UpdateLog(db_path, ttl=0)
+    assert log.claim(424242, 5)
+    assert log.claim(424242, 5)
+
+def test_window_forgets_the_least_recently_seen_message(db_path):
+    log = UpdateLog(db_path, capacity=2)
+    log.claim(1, 1)
+    log.claim(1, 2)
+    assert not log.claim(1, 1)  # refreshes 1, so 2 is now the oldest
+    log.claim(1, 3)
+    assert list(log.handled) == [(1, 1), (1, 3)]
+    assert log.claim(1, 2)
+
+def test_restart_warms_only_the_newest_claims(db_path, monkeypatch):
+    ticks = itertools.count(1_000_000)
+    monkeypatch.setattr(update_log.time, "time", lambda: next(ticks))
+    log = UpdateLog(db_path, capacity=2)
+    for message_id in (1, 2, 3):
+        log.claim(1, message_id)
+    assert list(UpdateLog(db_path, capacity=2).handled) == [(1, 2), (1, 3)]
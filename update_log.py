@@ -0,0 +1,111 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import List
+
+from config import DB_FILE, DEDUP_CAPACITY, DEDUP_TTL
+
+logger = logging.getLogger(__name__)
+
+class UpdateLog:
+    """Durable record of which updates have been received and handled
+
+    - The polling offset is saved together with the fetched updates, so
+      getUpdates resumes where it left off after a restart.
+    - Fetched updates stay in an inbox until handled; anything still there
+      at startup was acknowledged to Telegram but never finished, and is
+      replayed.
+    - A bounded (chat_id, message_id) window with LRU and TTL eviction
+      makes handling idempotent, so a replayed update that was already
+      (partly) handled is not handled again.
+    """
+
+    def __init__(self, path: str = DB_FILE, capacity: int = DEDUP_CAPACITY, ttl: float = DEDUP_TTL):
+        self.capacity = capacity
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS update_inbox (update_id INTEGER PRIMARY KEY, body TEXT NOT NULL)"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS handled_messages ("
+            " chat_id INTEGER NOT NULL,"
+            " message_id INTEGER NOT NULL,"
+            " handled REAL NOT NULL,"
+            " PRIMARY KEY (chat_id, message_id)) WITHOUT ROWID"
+        )
+        self.handled: OrderedDict = OrderedDict()
+        self.load_handled()
+
+    def load_handled(self):
+        """Drop expired entries and warm the in-memory window from disk"""
+        cutoff = time.time() - self.ttl
+        with self.lock:
+            self.conn.execute("DELETE FROM handled_messages WHERE handled < ?", (cutoff,))
+            rows = self.conn.execute(
+                "SELECT chat_id, message_id, handled FROM handled_messages ORDER BY handled DESC LIMIT ?",
+                (self.capacity,)
+            ).fetchall()
+        for chat_id, message_id, handled in reversed(rows):
+            self.handled[(chat_id, message_id)] = handled
+
+    @property
+    def offset(self) -> int:
+        """Next update_id to ask getUpdates for (0 if never polled)"""
+        with self.lock:
+            row = self.conn.execute("SELECT value FROM meta WHERE key = 'update_offset'").fetchone()
+        return int(row[0]) if row else 0
+
+    def record_fetched(self, updates: List[dict], offset: int = None):
+        """Store fetched updates (and the new offset) before they are acknowledged"""
+        if not updates:
+            return
+        with self.lock:
+            self.conn.execute("BEGIN")
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO update_inbox (update_id, body) VALUES (?, ?)",
+                ((update["update_id"], json.dumps(update)) for update in updates)
+            )
+            if offset is not None:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO meta (key, value) VALUES ('update_offset', ?)", (str(offset),)
+                )
+            self.conn.execute("COMMIT")
+
+    def done(self, update_id: int):
+        """Remove a handled update from the inbox"""
+        with self.lock:
+            self.conn.execute("DELETE FROM update_inbox WHERE update_id = ?", (update_id,))
+
+    def unfinished(self) -> List[dict]:
+        """Updates received but never handled, oldest first"""
+        with self.lock:
+            rows = self.conn.execute("SELECT body FROM update_inbox ORDER BY update_id").fetchall()
+        return [json.loads(body) for body, in rows]
+
+    def claim(self, chat_id: int, message_id: int) -> bool:
+        """Mark a message as handled; False if it already was (within the window)"""
+        key = (chat_id, message_id)
+        now = time.time()
+        with self.lock:
+            handled = self.handled.get(key)
+            if handled is not None and now - handled < self.ttl:
+                self.handled.move_to_end(key)
+                return False
+
+            self.handled[key] = now
+            self.handled.move_to_end(key)
+            while len(self.handled) > self.capacity:
+                self.handled.popitem(last=False)
+            self.conn.execute(
+                "INSERT OR REPLACE INTO handled_messages (chat_id, message_id, handled) VALUES (?, ?, ?)",
+                (chat_id, message_id, now)
+            )
+        return True
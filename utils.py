@@ -1,7 +1,9 @@
-import json
+import atexit
 import logging
-from typing import Dict, List, Set
-from config import GROUPS_FILE
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+from storage import GroupStore, create_group_store
 
 # Set up logging
 logging.basicConfig(
@@ -10,82 +12,135 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+class Group:
+    """Compact record for one tracked group"""
+    
+    __slots__ = ('id', 'title', 'type', 'active', 'added_date', 'bot_id')
+    
+    def __init__(self, id: int, title: str, type: str, active: bool = True, added_date: str = None,
+                 bot_id: Optional[int] = None):
+        self.id = id
+        self.title = title
+        self.type = type
+        self.active = active
+        self.added_date = added_date
+        # Pool bot that broadcasts to this group; None means the primary bot
+        self.bot_id = bot_id
+    
+    @classmethod
+    def from_dict(cls, data: dict) -> 'Group':
+        return cls(
+            data['id'],
+            data.get('title', 'Unknown Group'),
+            data.get('type', 'group'),
+            data.get('active', True),
+            data.get('added_date'),
+            data.get('bot_id')
+        )
+    
+    def to_dict(self) -> dict:
+        return {
+            'id': self.id,
+            'title': self.title,
+            'type': self.type,
+            'active': self.active,
+            'added_date': self.added_date,
+            'bot_id': self.bot_id
+        }
+
 class GroupManager:
-    def __init__(self):
-        self.groups_file = GROUPS_FILE
-        self.groups = self.load_groups()
+    def __init__(self, store: GroupStore = None):
+        self.store = store or create_group_store()
+        self.lock = threading.RLock()
+        self.groups: Dict[str, Group] = self.load_groups()
+        # Active groups in insertion order, maintained on every mutation
+        self.active: Dict[int, Group] = {
+            group.id: group for group in self.groups.values() if group.active
+        }
+        self.store.attach(self.snapshot)
+        atexit.register(self.store.close)
     
-    def load_groups(self) -> Dict:
-        """Load groups from JSON file"""
-        try:
-            with open(self.groups_file, 'r') as f:
-                return json.load(f)
-        except FileNotFoundError:
-            logger.info("Groups file not found, creating new one")
-            return {}
-        except json.JSONDecodeError:
-            logger.error("Invalid JSON in groups file, starting fresh")
-            return {}
+    def load_groups(self) -> Dict[str, Group]:
+        """Load groups from the storage backend"""
+        return {
+            group_id: Group.from_dict(data)
+            for group_id, data in self.store.load().items()
+        }
+    
+    def snapshot(self) -> Dict[str, dict]:
+        """Every group as a plain record, for backends that rewrite them all at once"""
+        with self.lock:
+            return {group_id: group.to_dict() for group_id, group in self.groups.items()}
     
-    def save_groups(self):
-        """Save groups to JSON file"""
-        try:
-            with open(self.groups_file, 'w') as f:
-                json.dump(self.groups, f, indent=2)
-            logger.info(f"Saved {len(self.groups)} groups to file")
-        except Exception as e:
-            logger.error(f"Error saving groups: {e}")
+    def flush(self):
+        """Persist any buffered changes now (e.g. at the end of a broadcast)"""
+        self.store.flush()
     
     def add_group(self, chat_id: int, chat_title: str, chat_type: str):
         """Add a new group to tracking"""
         group_id = str(chat_id)
-        self.groups[group_id] = {
-            'id': chat_id,
-            'title': chat_title,
-            'type': chat_type,
-            'active': True,
-            'added_date': str(datetime.now())
-        }
-        self.save_groups()
+        group = Group(chat_id, chat_title, chat_type, True, str(datetime.now()))
+        with self.lock:
+            self.groups[group_id] = group
+            self.active[chat_id] = group
+            self.store.save_group(group.to_dict())
         logger.info(f"Added group: {chat_title} ({chat_id})")
     
     def remove_group(self, chat_id: int):
         """Remove a group from tracking"""
         group_id = str(chat_id)
-        if group_id in self.groups:
+        with self.lock:
+            if group_id not in self.groups:
+                return
             del self.groups[group_id]
-            self.save_groups()
-            logger.info(f"Removed group: {chat_id}")
+            self.active.pop(chat_id, None)
+            self.store.delete_group(group_id)
+        logger.info(f"Removed group: {chat_id}")
     
     def deactivate_group(self, chat_id: int):
         """Mark a group as inactive (bot removed/blocked)"""
-        group_id = str(chat_id)
-        if group_id in self.groups:
-            self.groups[group_id]['active'] = False
-            self.save_groups()
-            logger.info(f"Deactivated group: {chat_id}")
+        with self.lock:
+            group = self.groups.get(str(chat_id))
+            if group is None:
+                return
+            group.active = False
+            self.active.pop(chat_id, None)
+            self.store.save_group(group.to_dict())
+        logger.info(f"Deactivated group: {chat_id}")
+    
+    def assign_bot(self, chat_id: int, bot_id: Optional[int]):
+        """Choose which pool bot broadcasts to a group (None for the primary bot)"""
+        with self.lock:
+            group = self.groups.get(str(chat_id))
+            if group is None or group.bot_id == bot_id:
+                return
+            group.bot_id = bot_id
+            self.store.save_group(group.to_dict())
+        logger.info(f"Assigned group {chat_id} to bot {bot_id or 'primary'}")
+    
+    def get_bot_assignments(self) -> Dict[int, Optional[int]]:
+        """Map each active group to the pool bot that broadcasts to it"""
+        with self.lock:
+            return {chat_id: group.bot_id for chat_id, group in self.active.items()}
     
     def get_active_groups(self) -> List[int]:
         """Get list of active group IDs"""
-        return [
-            group['id'] for group in self.groups.values() 
-            if group.get('active', True)
-        ]
+        with self.lock:
+            return list(self.active)
     
     def get_group_count(self) -> int:
         """Get count of active groups"""
-        return len([g for g in self.groups.values() if g.get('active', True)])
+        return len(self.active)
     
     def get_groups_info(self) -> str:
         """Get formatted string with groups information"""
-        active_groups = [g for g in self.groups.values() if g.get('active', True)]
+        with self.lock:
+            active_groups = list(self.active.values())
         if not active_groups:
             return "📭 No active groups connected"
         
-        info = f"📊 *Active Groups: {len(active_groups)}*\n\n"
+        lines = [f"📊 *Active Groups: {len(active_groups)}*\n"]
         for group in active_groups:
-            info += f"• {group['title']} ({group['type']})\n"
+            lines.append(f"• {group.title} ({group.type})")
         
-        return info
-
-from datetime import datetime
+        return "\n".join(lines) + "\n"